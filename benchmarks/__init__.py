@@ -0,0 +1,2 @@
+"""Offline benchmarks for marznode, run them from the repository root e.g.
+`python -m benchmarks.wire_format`, or the whole suite with `python -m benchmarks`"""
@@ -0,0 +1,58 @@
+"""Runs the storage, sync path and config parsing benchmarks and prints them as JSON,
+outputs of two commits can be compared key by key"""
+
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+
+from . import config_parsing, storage_ops, sync_path
+
+MAX_CONFIG_CLIENTS = 10_000
+"""commentjson takes minutes to parse configs with more clients than this"""
+
+
+def _commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--users", type=int, nargs="+", default=[1_000, 10_000, 100_000]
+    )
+    parser.add_argument("--output", help="writes the results to a file as well")
+    args = parser.parse_args()
+
+    results = {
+        "commit": _commit(),
+        "python": platform.python_version(),
+        "started_at": time.time(),
+        "storage": {},
+        "sync": {},
+        "config": {},
+    }
+    for users in args.users:
+        print(f"benchmarking {users} users", file=sys.stderr)
+        results["storage"][str(users)] = storage_ops.run(users)
+        results["sync"][str(users)] = sync_path.run(users)
+        clients = min(users, MAX_CONFIG_CLIENTS)
+        if str(clients) not in results["config"]:
+            results["config"][str(clients)] = config_parsing.run(clients)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Stand-ins for the cores and the grpc streams so benchmarks run offline"""
+
+import time
+from collections.abc import AsyncIterator
+
+from marznode.backends.abstract_backend import VPNBackend
+from marznode.models import Inbound, User
+from marznode.service.service_pb2 import Inbound as InboundPb2
+from marznode.service.service_pb2 import User as UserPb2, UserData
+from marznode.storage import BaseStorage
+
+TAGS = ["vless-reality", "vmess-ws", "trojan-grpc", "shadowsocks"]
+
+
+def user_tags(uid: int) -> list[str]:
+    """spreads users over one to all of TAGS"""
+    return TAGS[: uid % len(TAGS) + 1]
+
+
+def users_data(users: int, start: int = 1) -> list[UserData]:
+    return [
+        UserData(
+            user=UserPb2(id=uid, username=f"user{uid}", key=f"{uid:032x}"),
+            inbounds=[InboundPb2(tag=tag) for tag in user_tags(uid)],
+        )
+        for uid in range(start, start + users)
+    ]
+
+
+class StubBackend(VPNBackend):
+    """a backend which only keeps track of its users in memory"""
+
+    backend_type = "stub"
+    config_format = 0
+
+    def __init__(self, storage: BaseStorage, tags: list[str] = TAGS):
+        super().__init__()
+        self._storage = storage
+        self._inbounds = [
+            Inbound(tag=tag, protocol="vless", config={"flow": None}) for tag in tags
+        ]
+        self.users = {tag: set() for tag in tags}
+
+    @property
+    def version(self) -> str:
+        return "0"
+
+    @property
+    def running(self) -> bool:
+        return True
+
+    def contains_tag(self, tag: str) -> bool:
+        return tag in self.users
+
+    async def start(self, backend_config=None) -> None:
+        for inbound in self._inbounds:
+            self._storage.register_inbound(inbound)
+
+    async def restart(self, backend_config=None) -> None:
+        pass
+
+    async def add_user(self, user: User, inbound: Inbound) -> None:
+        self.users[inbound.tag].add(user.id)
+
+    async def remove_user(self, user: User, inbound: Inbound) -> None:
+        self.users[inbound.tag].discard(user.id)
+
+    async def get_logs(self, include_buffer: bool) -> AsyncIterator:
+        yield b""
+
+    async def get_usages(self, reset: bool = True) -> dict[int, int]:
+        return self._merge_buffered_usages({})
+
+    def list_inbounds(self) -> list[Inbound]:
+        return self._inbounds
+
+    def get_config(self) -> str:
+        return ""
+
+
+class StubStream:
+    """replays a list of client messages and collects the responses"""
+
+    def __init__(self, messages: list):
+        self._messages = messages
+        self.sent = []
+
+    async def __aiter__(self):
+        for message in self._messages:
+            yield message
+
+    async def recv_message(self):
+        return self._messages.pop(0) if self._messages else None
+
+    async def send_message(self, message) -> None:
+        self.sent.append(message)
+
+
+async def timed(coroutine) -> float:
+    started = time.perf_counter()
+    await coroutine
+    return time.perf_counter() - started
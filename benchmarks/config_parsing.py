@@ -0,0 +1,102 @@
+"""Measures parsing large xray and sing-box configs"""
+
+import argparse
+import json
+import time
+
+from marznode.backends.singbox._config import SingBoxConfig
+from marznode.backends.xray._config import XrayConfig
+from marznode.models import User
+
+INBOUNDS = 32
+"""inbounds per config, clients are spread over them"""
+TRANSPORTS = [
+    ("ws", {"wsSettings": {"path": "/ws"}}),
+    ("grpc", {"grpcSettings": {"serviceName": "grpc"}}),
+    ("tcp", {"tcpSettings": {"header": {"type": "none"}}}),
+    ("httpupgrade", {"httpupgradeSettings": {"path": "/up"}}),
+]
+
+
+def xray_config(clients: int) -> str:
+    inbounds = []
+    for i in range(INBOUNDS):
+        network, settings = TRANSPORTS[i % len(TRANSPORTS)]
+        inbounds.append(
+            {
+                "tag": f"vless-{network}-{i}",
+                "protocol": "vless",
+                "port": 10000 + i,
+                "settings": {
+                    "clients": [
+                        {"id": f"{uid:032x}", "email": f"{uid}.user{uid}"}
+                        for uid in range(i, clients, INBOUNDS)
+                    ],
+                    "decryption": "none",
+                },
+                "streamSettings": {"network": network, **settings},
+            }
+        )
+    return json.dumps({"inbounds": inbounds, "outbounds": [{"protocol": "freedom"}]})
+
+
+def singbox_config(clients: int) -> str:
+    inbounds = [
+        {
+            "tag": f"vless-ws-{i}",
+            "type": "vless",
+            "listen_port": 10000 + i,
+            "users": [
+                {"name": f"{uid}.user{uid}", "uuid": f"{uid:032x}"}
+                for uid in range(i, clients, INBOUNDS)
+            ],
+            "transport": {"type": "ws", "path": "/ws"},
+        }
+        for i in range(INBOUNDS)
+    ]
+    return json.dumps({"inbounds": inbounds, "outbounds": [{"type": "direct"}]})
+
+
+def _timed(func) -> tuple[float, object]:
+    started = time.perf_counter()
+    result = func()
+    return time.perf_counter() - started, result
+
+
+def run(clients: int) -> dict:
+    xray = xray_config(clients)
+    xray_time, _ = _timed(lambda: XrayConfig(xray))
+    singbox = singbox_config(clients)
+    singbox_time, config = _timed(lambda: SingBoxConfig(singbox))
+
+    inbounds = config.list_inbounds()
+
+    def append_users():
+        for uid in range(clients, 2 * clients):
+            config.append_user(
+                User(id=uid, username=f"user{uid}", key=f"{uid:032x}"),
+                inbounds[uid % INBOUNDS],
+            )
+
+    append_time, _ = _timed(append_users)
+    return {
+        "xray_config_bytes": len(xray),
+        "xray_parse_seconds": xray_time,
+        "singbox_config_bytes": len(singbox),
+        "singbox_parse_seconds": singbox_time,
+        "singbox_append_users_per_second": clients / append_time,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clients", type=int, nargs="+", default=[10_000])
+    args = parser.parse_args()
+
+    print(
+        json.dumps({str(clients): run(clients) for clients in args.clients}, indent=2)
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Measures inbound queries of MemoryStorage against the previous full scans"""
+
+import argparse
+import asyncio
+import json
+import time
+
+from marznode.models import Inbound, User
+from marznode.storage import MemoryStorage
+
+RARE_TAG = "rare"
+"""an inbound only every 1000th user has"""
+COMMON_TAG = "common"
+"""an inbound every other user has"""
+
+
+class ScanningStorage(MemoryStorage):
+    """MemoryStorage as it was before keeping an inbound -> users index"""
+
+    async def list_inbound_users(self, tag: str) -> list[User]:
+        users = []
+        for user in self.storage["users"].values():
+            for inbound in user.inbounds:
+                if inbound.tag == tag:
+                    users.append(user)
+                    break
+        return users
+
+    def remove_inbound(self, inbound: Inbound | str) -> None:
+        tag = inbound if isinstance(inbound, str) else inbound.tag
+        if tag in self.storage["inbounds"]:
+            self.storage["inbounds"].pop(tag)
+        for user_id, user in self.storage["users"].items():
+            user.inbounds = list(filter(lambda inb: inb.tag != tag, user.inbounds))
+
+
+async def _fill(storage: MemoryStorage, users: int) -> None:
+    inbounds = {
+        tag: Inbound(tag=tag, protocol="vless", config={})
+        for tag in (RARE_TAG, COMMON_TAG, "other")
+    }
+    for inbound in inbounds.values():
+        storage.register_inbound(inbound)
+    for uid in range(1, users + 1):
+        user_inbounds = [inbounds["other"]]
+        if uid % 2 == 0:
+            user_inbounds.append(inbounds[COMMON_TAG])
+        if uid % 1000 == 0:
+            user_inbounds.append(inbounds[RARE_TAG])
+        await storage.update_user_inbounds(
+            User(id=uid, username=f"user{uid}", key=f"{uid:032x}"), user_inbounds
+        )
+
+
+async def _time(coro_func) -> float:
+    started = time.perf_counter()
+    await coro_func()
+    return time.perf_counter() - started
+
+
+async def bench(storage_class: type[MemoryStorage], users: int) -> dict:
+    storage = storage_class()
+    fill_time = await _time(lambda: _fill(storage, users))
+    results = {"fill_seconds": fill_time}
+    for tag in (RARE_TAG, COMMON_TAG):
+        results[f"list_inbound_users_{tag}_seconds"] = await _time(
+            lambda: storage.list_inbound_users(tag)
+        )
+
+    async def remove_inbound():
+        storage.remove_inbound(RARE_TAG)
+
+    results["remove_inbound_rare_seconds"] = await _time(remove_inbound)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, nargs="+", default=[100_000])
+    args = parser.parse_args()
+
+    results = {
+        str(users): {
+            "indexed": asyncio.run(bench(MemoryStorage, users)),
+            "scanning": asyncio.run(bench(ScanningStorage, users)),
+        }
+        for users in args.users
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Measures dumping the in-memory storages into a snapshot and restoring them"""
+
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+from marznode.models import Inbound, User
+from marznode.storage import (
+    BaseStorage,
+    ColumnarStorage,
+    MemoryStorage,
+    StorageSnapshotter,
+)
+
+TAGS = ["vless-reality", "vmess-ws", "trojan-grpc", "shadowsocks"]
+STORAGES = {"memory": MemoryStorage, "columnar": ColumnarStorage}
+
+
+async def _fill(storage: BaseStorage, users: int) -> None:
+    for tag in TAGS:
+        storage.register_inbound(Inbound(tag=tag, protocol="vless", config={}))
+    for uid in range(1, users + 1):
+        await storage.update_user_inbounds(
+            User(id=uid, username=f"user{uid}", key=f"{uid:032x}"),
+            await storage.list_inbounds(tag=TAGS[: uid % len(TAGS) + 1]),
+        )
+
+
+async def bench(storage_class: type[BaseStorage], users: int) -> dict:
+    storage = storage_class()
+    await _fill(storage, users)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "snapshot")
+        started = time.perf_counter()
+        await StorageSnapshotter(storage, path, 0).dump()
+        dump_time = time.perf_counter() - started
+        size = os.path.getsize(path)
+
+        restored = storage_class()
+        started = time.perf_counter()
+        StorageSnapshotter(restored, path, 0).restore()
+        restore_time = time.perf_counter() - started
+    return {
+        "bytes": size,
+        "dump_seconds": dump_time,
+        "restore_seconds": restore_time,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, nargs="+", default=[100_000])
+    args = parser.parse_args()
+
+    results = {
+        str(users): {
+            name: asyncio.run(bench(storage_class, users))
+            for name, storage_class in STORAGES.items()
+        }
+        for users in args.users
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Measures the operations of the in-memory storages"""
+
+import argparse
+import asyncio
+import json
+import random
+
+from marznode.models import Inbound, User
+from marznode.storage import BaseStorage, ColumnarStorage, MemoryStorage
+from ._stubs import TAGS, timed, user_tags
+
+STORAGES = {"memory": MemoryStorage, "columnar": ColumnarStorage}
+LOOKUPS = 10_000
+"""how many random users are looked up, updated and removed"""
+
+
+async def bench(storage_class: type[BaseStorage], users: int) -> dict:
+    storage = storage_class()
+    inbounds = {tag: Inbound(tag=tag, protocol="vless", config={}) for tag in TAGS}
+    for inbound in inbounds.values():
+        storage.register_inbound(inbound)
+
+    async def fill():
+        for uid in range(1, users + 1):
+            await storage.update_user_inbounds(
+                User(id=uid, username=f"user{uid}", key=f"{uid:032x}"),
+                [inbounds[tag] for tag in user_tags(uid)],
+            )
+
+    sample = random.Random(users).sample(range(1, users + 1), min(LOOKUPS, users))
+
+    async def lookup():
+        for uid in sample:
+            await storage.list_users(uid)
+
+    async def update():
+        for uid in sample:
+            await storage.update_user_inbounds(
+                User(id=uid, username=f"user{uid}", key=f"{uid:032x}"),
+                [inbounds[tag] for tag in user_tags(uid + 1)],
+            )
+
+    async def remove():
+        for uid in sample:
+            await storage.remove_user(User(id=uid, username="", key=""))
+
+    fill_time = await timed(fill())
+    results = {
+        "fill_users_per_second": users / fill_time,
+        "lookup_users_per_second": len(sample) / await timed(lookup()),
+        "list_users_seconds": await timed(storage.list_users()),
+        "list_inbound_users_seconds": {
+            tag: await timed(storage.list_inbound_users(tag)) for tag in TAGS
+        },
+        "list_user_ids_seconds": await timed(storage.list_user_ids()),
+        "update_users_per_second": len(sample) / await timed(update()),
+        "remove_users_per_second": len(sample) / await timed(remove()),
+    }
+    results["flush_users_seconds"] = await timed(storage.flush_users())
+    return results
+
+
+def run(users: int) -> dict:
+    return {
+        name: asyncio.run(bench(storage_class, users))
+        for name, storage_class in STORAGES.items()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, nargs="+", default=[100_000])
+    args = parser.parse_args()
+
+    print(json.dumps({str(users): run(users) for users in args.users}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
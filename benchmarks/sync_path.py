@@ -0,0 +1,58 @@
+"""Measures the throughput of MarzService syncing users into stub backends"""
+
+import argparse
+import asyncio
+import json
+
+from marznode.service import MarzService
+from marznode.service._packing import pack_users, unpack_user
+from marznode.service.service_pb2 import UsersData
+from marznode.storage import MemoryStorage
+from ._stubs import StubBackend, StubStream, timed, users_data
+
+
+async def bench(users: int) -> dict:
+    storage = MemoryStorage()
+    backend = StubBackend(storage)
+    await backend.start()
+    service = MarzService(storage, {"stub": backend})
+    updates = [unpack_user(user_data) for user_data in users_data(users)]
+
+    async def update_user():
+        for user, inbound_tags in updates:
+            await service._update_user(user, inbound_tags)
+
+    update_time = await timed(update_user())
+    await storage.flush_users()
+
+    sync_time = await timed(service.SyncUsers(StubStream(users_data(users))))
+
+    def repopulate_stream() -> StubStream:
+        packed = pack_users(unpack_user(u) for u in users_data(users))
+        return StubStream([UsersData(packed=packed)])
+
+    await storage.flush_users()
+    repopulate_time = await timed(service.RepopulateUsers(repopulate_stream()))
+    unchanged_time = await timed(service.RepopulateUsers(repopulate_stream()))
+    return {
+        "update_user_per_second": users / update_time,
+        "sync_users_per_second": users / sync_time,
+        "repopulate_users_per_second": users / repopulate_time,
+        "repopulate_unchanged_users_per_second": users / unchanged_time,
+    }
+
+
+def run(users: int) -> dict:
+    return asyncio.run(bench(users))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, nargs="+", default=[100_000])
+    args = parser.parse_args()
+
+    print(json.dumps({str(users): run(users) for users in args.users}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Measures the memory a user takes in the in-memory storages and on the sync path"""
+
+import argparse
+import asyncio
+import gc
+import json
+import time
+import tracemalloc
+
+from marznode.models import Inbound, User
+from marznode.service._packing import unpack_user
+from marznode.service.service_pb2 import Inbound as InboundPb2
+from marznode.service.service_pb2 import User as UserPb2, UserData
+from marznode.storage import BaseStorage, ColumnarStorage, MemoryStorage
+
+TAGS = ["vless-reality", "vmess-ws", "trojan-grpc", "shadowsocks"]
+STORAGES = {"memory": MemoryStorage, "columnar": ColumnarStorage}
+
+
+async def _fill(storage: BaseStorage, users: int) -> None:
+    inbounds = [Inbound(tag=tag, protocol="vless", config={}) for tag in TAGS]
+    for inbound in inbounds:
+        storage.register_inbound(inbound)
+    for uid in range(1, users + 1):
+        await storage.update_user_inbounds(
+            User(id=uid, username=f"user{uid}", key=f"{uid:032x}"),
+            await storage.list_inbounds(tag=TAGS[: uid % len(TAGS) + 1]),
+        )
+
+
+def measure_storage(storage_class: type[BaseStorage], users: int) -> dict:
+    gc.collect()
+    tracemalloc.start()
+    storage = storage_class()
+    asyncio.run(_fill(storage, users))
+    gc.collect()
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"bytes_per_user": allocated / users}
+
+
+def measure_unpacking(users: int) -> dict:
+    messages = [
+        UserData(
+            user=UserPb2(id=uid, username=f"user{uid}", key=f"{uid:032x}"),
+            inbounds=[InboundPb2(tag=tag) for tag in TAGS[: uid % len(TAGS) + 1]],
+        )
+        for uid in range(1, users + 1)
+    ]
+    started = time.perf_counter()
+    for message in messages:
+        unpack_user(message)
+    return {"unpack_seconds_per_user": (time.perf_counter() - started) / users}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, nargs="+", default=[200_000])
+    parser.add_argument("--storage", choices=STORAGES, default="memory")
+    args = parser.parse_args()
+
+    results = {
+        str(users): measure_storage(STORAGES[args.storage], users)
+        | measure_unpacking(users)
+        for users in args.users
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Compares the nested and packed forms of UsersStats and UsersData messages"""
+
+import argparse
+import json
+import time
+
+from marznode.models import User
+from marznode.service._packing import pack_users, unpack_users, users_stats
+from marznode.service.service_pb2 import (
+    Inbound,
+    User as UserPb2,
+    UserData,
+    UsersData,
+    UsersStats,
+)
+
+TAGS = ["vless-reality", "vmess-ws", "trojan-grpc", "shadowsocks"]
+
+
+def _timed(func, rounds: int) -> tuple[float, object]:
+    best, result = float("inf"), None
+    for _ in range(rounds):
+        started = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def _measure(encode, decode, rounds: int) -> dict:
+    encode_time, payload = _timed(encode, rounds)
+    decode_time, _ = _timed(lambda: decode(payload), rounds)
+    return {
+        "bytes": len(payload),
+        "encode_seconds": encode_time,
+        "decode_seconds": decode_time,
+    }
+
+
+def bench_users_stats(users: int, rounds: int) -> dict:
+    usages = {uid: uid * 7919 for uid in range(1, users + 1)}
+
+    def decode_nested(payload: bytes):
+        message = UsersStats.FromString(payload)
+        return {s.uid: s.usage for s in message.users_stats}
+
+    def decode_packed(payload: bytes):
+        message = UsersStats.FromString(payload)
+        return dict(zip(message.packed.uids, message.packed.usages))
+
+    return {
+        "nested": _measure(
+            lambda: users_stats(usages).SerializeToString(), decode_nested, rounds
+        ),
+        "packed": _measure(
+            lambda: users_stats(usages, packed=True).SerializeToString(),
+            decode_packed,
+            rounds,
+        ),
+    }
+
+
+def bench_users_data(users: int, rounds: int) -> dict:
+    updates = [
+        (
+            User(id=uid, username=f"user{uid}", key=f"{uid:032x}"),
+            TAGS[: uid % len(TAGS) + 1],
+        )
+        for uid in range(1, users + 1)
+    ]
+
+    def encode_nested():
+        return UsersData(
+            users_data=[
+                UserData(
+                    user=UserPb2(id=user.id, username=user.username, key=user.key),
+                    inbounds=[Inbound(tag=tag) for tag in tags],
+                )
+                for user, tags in updates
+            ]
+        ).SerializeToString()
+
+    def encode_packed():
+        return UsersData(packed=pack_users(updates)).SerializeToString()
+
+    def decode(payload: bytes):
+        return unpack_users(UsersData.FromString(payload))
+
+    return {
+        "nested": _measure(encode_nested, decode, rounds),
+        "packed": _measure(encode_packed, decode, rounds),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    results = {
+        str(users): {
+            "users_stats": bench_users_stats(users, args.rounds),
+            "users_data": bench_users_data(users, args.rounds),
+        }
+        for users in args.users
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""Retries backend operations which failed as the core was unreachable"""
+
+import asyncio
+import logging
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from itertools import chain
+
+from marznode.models import User, Inbound
+
+logger = logging.getLogger(__name__)
+
+BulkOperation = Callable[[list[tuple[User, Inbound]]], Awaitable[list]]
+
+_BACKOFF = 1.0
+"""seconds to wait before the first retry, doubled after every failed one"""
+_MAX_BACKOFF = 30.0
+
+
+@dataclass(slots=True)
+class _Pending:
+    inbound: Inbound
+    removed: User | None
+    """the user to remove from the inbound first, as the core has it"""
+    added: User | None
+    queued_at: float
+
+
+class RetryQueue:
+    """
+    keeps the failed operations of a backend, one entry per user and inbound
+    so an addition and a removal which both failed cancel out,
+    they're retried with a backoff until the core can be reached again
+    """
+
+    def __init__(self, remove: BulkOperation, add: BulkOperation):
+        """
+        :param remove: removes users from inbounds, returns a result per user
+        which is an OSError if the core couldn't be reached
+        :param add: adds users to inbounds, likewise
+        """
+        self._remove = remove
+        self._add = add
+        self._pending: dict[tuple[int, str], _Pending] = {}
+        self._draining: dict[tuple[int, str], _Pending] = {}
+        self._task: asyncio.Task | None = None
+        self._clears = 0
+        """operations being retried while the queue is cleared are dropped"""
+
+    def __len__(self) -> int:
+        return len(self._pending) + len(self._draining)
+
+    def __contains__(self, key: tuple[int, str]) -> bool:
+        """operations on users and inbounds that are in the queue
+        should be queued as well so they're applied in order"""
+        return key in self._pending or key in self._draining
+
+    @property
+    def age(self) -> float:
+        """seconds since the oldest operation in the queue failed"""
+        entries = chain(self._pending.values(), self._draining.values())
+        oldest = min((entry.queued_at for entry in entries), default=None)
+        return 0.0 if oldest is None else time.monotonic() - oldest
+
+    @staticmethod
+    def _put(
+        pending: dict[tuple[int, str], _Pending],
+        inbound: Inbound,
+        removed: User | None,
+        added: User | None,
+        queued_at: float,
+    ) -> None:
+        key = ((removed or added).id, inbound.tag)
+        entry = pending.get(key)
+        if entry is None:
+            pending[key] = _Pending(inbound, removed, added, queued_at)
+        elif removed:
+            if entry.added and not entry.removed:
+                """the core never got the user"""
+                del pending[key]
+                entry = None
+            else:
+                entry.added = None
+        if entry is not None and added:
+            entry.added = added
+
+    def add(self, user: User, inbound: Inbound) -> None:
+        self._put(self._pending, inbound, None, user, time.monotonic())
+        self._start()
+
+    def remove(self, user: User, inbound: Inbound) -> None:
+        self._put(self._pending, inbound, user, None, time.monotonic())
+        self._start()
+
+    def clear(self) -> None:
+        """drops the queued operations, e.g. when the core is given
+        the users of the storage from scratch"""
+        self._pending = {}
+        self._clears += 1
+
+    def _start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._drain())
+
+    def _requeue(self, failed: dict[tuple[int, str], _Pending]) -> None:
+        """puts failed operations back in front of the ones queued meanwhile"""
+        queued, self._pending = self._pending, failed
+        for entry in queued.values():
+            if entry.removed:
+                self._put(
+                    self._pending, entry.inbound, entry.removed, None, entry.queued_at
+                )
+            if entry.added:
+                self._put(
+                    self._pending, entry.inbound, None, entry.added, entry.queued_at
+                )
+
+    async def _retry(self) -> dict[tuple[int, str], _Pending]:
+        """:return: the operations for which the core couldn't be reached"""
+        removals = [(k, e) for k, e in self._draining.items() if e.removed]
+        results = await self._remove([(e.removed, e.inbound) for _, e in removals])
+        failed = {}
+        for (key, entry), result in zip(removals, results):
+            if isinstance(result, OSError):
+                failed[key] = entry
+            elif result is not None:
+                logger.warning("dropped the removal of %s: %r", key, result)
+                entry.added = None
+
+        additions = [
+            (k, e) for k, e in self._draining.items() if e.added and k not in failed
+        ]
+        results = await self._add([(e.added, e.inbound) for _, e in additions])
+        for (key, entry), result in zip(additions, results):
+            if isinstance(result, OSError):
+                entry.removed = None
+                failed[key] = entry
+            elif result is not None:
+                logger.warning("dropped the addition of %s: %r", key, result)
+        return failed
+
+    async def _drain(self) -> None:
+        delay = _BACKOFF
+        while self._pending:
+            await asyncio.sleep(delay)
+            self._draining, self._pending = self._pending, {}
+            clears = self._clears
+            try:
+                failed = await self._retry()
+            except Exception:
+                logger.exception("retrying %i operations failed", len(self._draining))
+                failed = self._draining
+            finally:
+                self._draining = {}
+            if clears != self._clears:
+                failed = {}
+            self._requeue(failed)
+            delay = min(delay * 2, _MAX_BACKOFF) if failed else _BACKOFF
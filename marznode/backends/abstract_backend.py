@@ -1,15 +1,48 @@
 """What a vpn server should do"""
 
+import asyncio
+import logging
 from abc import ABC, abstractmethod
-from collections.abc import AsyncIterator
+from collections import defaultdict
+from collections.abc import AsyncIterator, Awaitable, Callable, Iterable
 from typing import Any
 
+from marznode.backends._retry import RetryQueue
+from marznode.config import BACKEND_USAGE_TIMEOUT, SYNC_USERS_CONCURRENCY
 from marznode.models import User, Inbound
 
+logger = logging.getLogger(__name__)
+
 
 class VPNBackend(ABC):
     backend_type: str
     config_format: int
+    retry_queue: RetryQueue | None = None
+    """operations waiting for the core to be reachable, if the backend queues them"""
+
+    def __init__(self):
+        self._usage_buffer: dict[int, int] = defaultdict(int)
+
+    async def _buffer_usages(self) -> None:
+        """reads the usages off the core before a restart or reload resets
+        them, they're handed out along with the next get_usages"""
+        try:
+            usages = await asyncio.wait_for(self.get_usages(), BACKEND_USAGE_TIMEOUT)
+        except Exception as error:
+            logger.warning(
+                "couldn't read usages of %s before resetting it: %r",
+                self.backend_type,
+                error,
+            )
+            return
+        for uid, usage in usages.items():
+            self._usage_buffer[uid] += usage
+
+    def _merge_buffered_usages(self, usages: dict[int, int]) -> dict[int, int]:
+        buffered, self._usage_buffer = self._usage_buffer, defaultdict(int)
+        for uid, usage in usages.items():
+            buffered[uid] += usage
+        return buffered
 
     @property
     @abstractmethod
@@ -41,6 +74,47 @@ class VPNBackend(ABC):
     async def remove_user(self, user: User, inbound: Inbound) -> None:
         raise NotImplementedError
 
+    @staticmethod
+    async def _run_concurrently(
+        operation: Callable[[User, Inbound], Awaitable[None]],
+        users: Iterable[tuple[User, Inbound]],
+    ) -> list[Exception | None]:
+        users = list(users)
+        results = [None] * len(users)
+        pending = iter(enumerate(users))
+
+        async def worker():
+            for index, (user, inbound) in pending:
+                try:
+                    await operation(user, inbound)
+                except Exception as error:
+                    results[index] = error
+
+        concurrency = min(SYNC_USERS_CONCURRENCY, len(users))
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return results
+
+    async def bulk_add(
+        self, users: Iterable[tuple[User, Inbound]]
+    ) -> list[Exception | None]:
+        """
+        adds many users to inbounds, backends override it
+        when they can do better than concurrent add_user calls
+        :param users: pairs of a user and the inbound to add it to
+        :return: the error of each addition in order, None if it succeeded
+        """
+        return await self._run_concurrently(self.add_user, users)
+
+    async def bulk_remove(
+        self, users: Iterable[tuple[User, Inbound]]
+    ) -> list[Exception | None]:
+        """
+        removes many users from inbounds
+        :param users: pairs of a user and the inbound to remove it from
+        :return: the error of each removal in order, None if it succeeded
+        """
+        return await self._run_concurrently(self.remove_user, users)
+
     @abstractmethod
     def get_logs(self, include_buffer: bool) -> AsyncIterator:
         raise NotImplementedError
@@ -10,6 +10,7 @@ from aiohttp import web, ClientConnectorError
 from marznode.backends.abstract_backend import VPNBackend
 from marznode.backends.hysteria2._config import HysteriaConfig
 from marznode.backends.hysteria2._runner import Hysteria
+from marznode.config import BACKEND_USAGE_TIMEOUT
 from marznode.models import User, Inbound
 from marznode.storage import BaseStorage
 from marznode.utils.key_gen import generate_password
@@ -23,6 +24,7 @@ class HysteriaBackend(VPNBackend):
     config_format = 2
 
     def __init__(self, executable_path: str, config_path: str, storage: BaseStorage):
+        super().__init__()
         self._app_runner = None
         self._executable_path = executable_path
         self._storage = storage
@@ -58,6 +60,11 @@ class HysteriaBackend(VPNBackend):
         with open(self._config_path, "w") as f:
             f.write(config)
 
+    async def add_storage_users(self):
+        for inbound in self._inbounds:
+            for user in await self._storage.list_inbound_users(inbound.tag):
+                await self.add_user(user, inbound)
+
     async def start(self, config: str | None = None) -> None:
         if config is None:
             with open(self._config_path) as f:
@@ -80,6 +87,7 @@ class HysteriaBackend(VPNBackend):
         cfg = HysteriaConfig(config, api_port, self._stats_port, self._stats_secret)
         cfg.register_inbounds(self._storage)
         self._inbounds = [cfg.get_inbound()]
+        await self.add_storage_users()
         await self._runner.start(cfg.render())
 
     async def stop(self):
@@ -90,6 +98,7 @@ class HysteriaBackend(VPNBackend):
     async def restart(self, backend_config: str | None) -> None:
         await self._restart_lock.acquire()
         try:
+            await self._buffer_usages()
             await self.stop()
             await self.start(backend_config)
         finally:
@@ -125,17 +134,18 @@ class HysteriaBackend(VPNBackend):
         url = "http://127.0.0.1:" + str(self._stats_port) + "/traffic?clear=1"
         headers = {"Authorization": self._stats_secret}
 
+        timeout = aiohttp.ClientTimeout(total=BACKEND_USAGE_TIMEOUT)
         try:
-            async with aiohttp.ClientSession() as session:
+            async with aiohttp.ClientSession(timeout=timeout) as session:
                 async with session.get(url, headers=headers) as response:
                     data = await response.json()
-        except ClientConnectorError:
+        except (ClientConnectorError, asyncio.TimeoutError):
             data = {}
         usages = {}
         for user_identifier, usage in data.items():
             uid = int(user_identifier.split(".")[0])
             usages[uid] = usage["tx"] + usage["rx"]
-        return usages
+        return self._merge_buffered_usages(usages)
 
     async def _auth_callback(self, request: web.Request):
         user_key = (await request.json())["auth"]
@@ -3,6 +3,7 @@ from dataclasses import dataclass
 
 from grpclib import client
 
+from marznode.config import BACKEND_USAGE_TIMEOUT
 from .sb_stats_grpc import StatsServiceStub
 from .sb_stats_pb2 import SysStatsRequest, QueryStatsRequest
 
@@ -63,10 +64,12 @@ class OutboundStatsResponse:
 class SingBoxAPIBase:
     """Base for sb api connections"""
 
-    def __init__(self, address: str, port: int):
+    def __init__(self, address: str, port: int, timeout: float = BACKEND_USAGE_TIMEOUT):
         """Initializes data for creating a grpc channel"""
         self.address = address
         self.port = port
+        self.timeout = timeout
+        """deadline of every call, so one sing-box never answers still ends"""
         self._channel = client.Channel(self.address, self.port)
         atexit.register(self._channel.close)
 
@@ -78,7 +81,7 @@ class SingBoxAPI(SingBoxAPIBase):
     async def get_sys_stats(self) -> SysStatsResponse:
         """Get System stats from Xray-core"""
         stub = StatsServiceStub(self._channel)
-        response = await stub.GetSysStats(SysStatsRequest())
+        response = await stub.GetSysStats(SysStatsRequest(), timeout=self.timeout)
 
         return SysStatsResponse(
             num_goroutine=response.NumGoroutine,
@@ -103,7 +106,7 @@ class SingBoxAPI(SingBoxAPIBase):
             reset: whether to reset sing-box statistics or not."""
         stub = StatsServiceStub(self._channel)
         response = await stub.QueryStats(
-            QueryStatsRequest(pattern=pattern, reset=reset)
+            QueryStatsRequest(pattern=pattern, reset=reset), timeout=self.timeout
         )
         results = []
         for stat in response.stat:
@@ -31,6 +31,7 @@ class SingBoxBackend(VPNBackend):
         config_path: str,
         storage: BaseStorage,
     ):
+        super().__init__()
         self._config = None
         self._config_update_event = asyncio.Event()
         self._inbound_tags = set()
@@ -62,6 +63,7 @@ class SingBoxBackend(VPNBackend):
                 if self._config_update_event.is_set():
                     logger.debug("updating sing-box users")
                     self._save_config(self._config.to_json(), full=True)
+                    await self._buffer_usages()
                     await self._runner.reload()
                     self._config_update_event.clear()
 
@@ -121,6 +123,7 @@ class SingBoxBackend(VPNBackend):
 
     async def restart(self, backend_config: str | None) -> list[Inbound] | None:
         async with self._restart_lock:
+            await self._buffer_usages()
             if not backend_config:
                 return await self._runner.restart(self._config)
             await self.stop()
@@ -138,17 +141,15 @@ class SingBoxBackend(VPNBackend):
 
     async def get_usages(self, reset: bool = True) -> dict[int, int]:
         try:
-            api_stats = await asyncio.wait_for(
-                self._api.get_users_stats(reset=reset), 3
-            )
-        except OSError:
+            api_stats = await self._api.get_users_stats(reset=reset)
+        except (OSError, asyncio.TimeoutError):
             api_stats = []
         stats = defaultdict(int)
         for stat in api_stats:
             uid = int(stat.name.split(".")[0])
             stats[uid] += stat.value
 
-        return stats
+        return self._merge_buffered_usages(stats)
 
     async def get_logs(self, include_buffer: bool = True):
         if include_buffer:
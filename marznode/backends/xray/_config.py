@@ -5,7 +5,8 @@ import commentjson
 
 from marznode.config import XRAY_EXECUTABLE_PATH, XRAY_VLESS_REALITY_FLOW, DEBUG
 from ._utils import get_x25519
-from ...models import Inbound
+from .api.types.account import account_client
+from ...models import Inbound, User
 from ...storage import BaseStorage
 
 transport_map = defaultdict(
@@ -68,6 +69,8 @@ class XrayConfig(dict):
 
         self.inbounds = []
         self.inbounds_by_tag = {}
+        self._inbound_configs = {}
+        self._config_clients = {}
         # self._fallbacks_inbound = self.get_inbound(XRAY_FALLBACKS_INBOUND_TAG)
         self._resolve_inbounds()
 
@@ -194,6 +197,33 @@ class XrayConfig(dict):
 
             self.inbounds.append(settings)
             self.inbounds_by_tag[inbound["tag"]] = settings
+            self._inbound_configs[inbound["tag"]] = inbound
+            self._config_clients[inbound["tag"]] = list(
+                inbound.get("settings", {}).get("clients", [])
+            )
+
+    def accepts_users(self, tag: str) -> bool:
+        """whether users of the inbound can be written in its clients,
+        shadowsocks 2022 takes base64 keys of the method's size which the
+        accounts don't have, so xray would refuse the whole config"""
+        inbound = self._inbound_configs[tag]
+        method = inbound.get("settings", {}).get("method", "")
+        return not (inbound["protocol"] == "shadowsocks" and method.startswith("2022-"))
+
+    def append_user(self, user: User, inbound: Inbound):
+        """adds the user to the clients of the inbound, for xray to start with"""
+        flow = inbound.config["flow"] or ""
+        client = account_client(inbound.protocol, user.key, flow)
+        settings = self._inbound_configs[inbound.tag].setdefault("settings", {})
+        settings.setdefault("clients", []).append(
+            {"email": f"{user.id}.{user.username}", **client}
+        )
+
+    def clear_users(self):
+        """drops the users appended so far, clients written in the config stay"""
+        for tag, clients in self._config_clients.items():
+            settings = self._inbound_configs[tag].setdefault("settings", {})
+            settings["clients"] = list(clients)
 
     def register_inbounds(self, storage: BaseStorage):
         for inbound in self.list_inbounds():
@@ -1,16 +1,39 @@
 """Implements initiation method to connect to xray api address"""
 
+import asyncio
 import atexit
 import ssl
+from itertools import cycle
+from typing import Any, TypeVar
 
-from grpclib import client
+from grpclib import GRPCError, Status, client
+from grpclib.config import Configuration
+from grpclib.exceptions import StreamTerminatedError
+
+from marznode.config import (
+    XRAY_API_CHANNELS,
+    XRAY_API_KEEPALIVE,
+    XRAY_API_RETRIES,
+    XRAY_API_TIMEOUT,
+)
+from .exceptions import RelatedError, XrayError
+
+Stub = TypeVar("Stub")
+
+_BACKOFF = 0.2
+"""seconds to wait before the first retry, doubled for every next one"""
 
 
 class XrayAPIBase:
     """Base for all Xray connections"""
 
     def __init__(
-        self, address: str, port: int, ssl_cert: str = None, ssl_target_name: str = None
+        self,
+        address: str,
+        port: int,
+        ssl_cert: str = None,
+        ssl_target_name: str = None,
+        channels: int = XRAY_API_CHANNELS,
     ):
         """Initializes data for creating a grpc channel"""
         self.ssl_context = None
@@ -19,5 +42,81 @@ class XrayAPIBase:
             self.ssl_context.check_hostname = False
         self.address = address
         self.port = port
-        self._channel = client.Channel(self.address, self.port, ssl=self.ssl_context)
-        atexit.register(self._channel.close)
+        """xray enforces grpc-go's defaults on keepalive pings, one at most
+        every 5 minutes and only while there are calls in flight"""
+        config = Configuration(
+            _keepalive_time=XRAY_API_KEEPALIVE,
+            _keepalive_timeout=XRAY_API_TIMEOUT,
+            _keepalive_permit_without_calls=False,
+        )
+        self._channels = [
+            client.Channel(self.address, self.port, ssl=self.ssl_context, config=config)
+            for _ in range(max(channels, 1))
+        ]
+        self._next_channel = cycle(range(len(self._channels)))
+        self._stubs: dict[tuple[type, int], Any] = {}
+        atexit.register(self.close)
+
+    def close(self) -> None:
+        for channel in self._channels:
+            channel.close()
+
+    def _stub(self, stub_class: type[Stub]) -> Stub:
+        """returns a stub on the next channel, channels are taken in turn
+        so that a burst of calls is spread over their connections"""
+        channel = next(self._next_channel)
+        try:
+            return self._stubs[stub_class, channel]
+        except KeyError:
+            stub = self._stubs[stub_class, channel] = stub_class(
+                self._channels[channel]
+            )
+            return stub
+
+    async def _call(
+        self,
+        stub_class: type,
+        method: str,
+        request: Any,
+        applied: tuple[type[XrayError], ...] = (),
+    ) -> Any:
+        """
+        calls a method of the api with a deadline, a request that couldn't
+        be sent as xray was unreachable is retried with an exponential backoff,
+        each time on another channel. one that may have reached xray never is,
+        e.g. a stats query which reset the counters before its reply was lost
+        :param stub_class: the stub of the service
+        :param method: name of the method
+        :param request: the request message
+        :param applied: errors which mean the request of a retried attempt
+        had been applied already, they're taken as success
+        :return: the response, None if taken as applied
+        :raises ConnectionError: when xray couldn't be reached, or the call
+        was cut off after its request was sent
+        """
+        for attempt in range(XRAY_API_RETRIES + 1):
+            if attempt:
+                await asyncio.sleep(_BACKOFF * 2 ** (attempt - 1))
+            call = getattr(self._stub(stub_class), method)
+            sent = False
+            try:
+                async with call.open(timeout=XRAY_API_TIMEOUT) as stream:
+                    await stream.send_request()
+                    sent = True
+                    await stream.send_message(request, end=True)
+                    return await stream.recv_message()
+            except GRPCError as error:
+                if attempt and isinstance(RelatedError(error), applied):
+                    return None
+                if sent or error.status is not Status.UNAVAILABLE:
+                    raise
+                failure = error
+            except (OSError, asyncio.TimeoutError, StreamTerminatedError) as error:
+                if sent:
+                    raise ConnectionError(
+                        f"xray api call was cut off: {error!r}"
+                    ) from error
+                failure = error
+        if isinstance(failure, GRPCError):
+            raise failure
+        raise ConnectionError(f"couldn't reach xray api: {failure!r}") from failure
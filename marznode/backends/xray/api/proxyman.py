@@ -1,12 +1,20 @@
 """Methods to update Xray-core users/inbounds"""
 
+import asyncio
+from collections.abc import Iterable
+
 import grpclib
 
 from .base import XrayAPIBase
-from .exceptions import RelatedError
+from .exceptions import (
+    EmailExistsError,
+    EmailNotFoundError,
+    RelatedError,
+    XrayError,
+)
 from .proto.app.proxyman.command import command_pb2, command_grpc
 from .proto.common.protocol import user_pb2
-from .types.account import Account
+from .types.account import Account, PreparedAccount
 from .types.message import Message, TypedMessage
 
 
@@ -21,16 +29,20 @@ from .types.message import Message, TypedMessage
 class Proxyman(XrayAPIBase):
     """Implements methods to update Xray-core users/inbounds"""
 
-    async def __alter_inbound(self, tag: str, operation: TypedMessage) -> None:
-        stub = command_grpc.HandlerServiceStub(self._channel)
+    async def __alter_inbound(
+        self, tag: str, operation: TypedMessage, applied: type[XrayError]
+    ) -> None:
         try:
-            await stub.AlterInbound(
-                command_pb2.AlterInboundRequest(tag=tag, operation=operation)
+            await self._call(
+                command_grpc.HandlerServiceStub,
+                "AlterInbound",
+                command_pb2.AlterInboundRequest(tag=tag, operation=operation),
+                (applied,),
             )
         except grpclib.exceptions.GRPCError as error:
             raise RelatedError(error) from error
 
-    async def add_inbound_user(self, tag: str, user: Account) -> None:
+    async def add_inbound_user(self, tag: str, user: Account | PreparedAccount) -> None:
         """Adds a user to an inbound"""
         await self.__alter_inbound(
             tag=tag,
@@ -41,12 +53,85 @@ class Proxyman(XrayAPIBase):
                     )
                 )
             ),
+            applied=EmailExistsError,
         )
 
     async def remove_inbound_user(self, tag: str, email: str) -> None:
         """Removes a user from an inbound"""
         await self.__alter_inbound(
-            tag=tag, operation=Message(command_pb2.RemoveUserOperation(email=email))
+            tag=tag,
+            operation=Message(command_pb2.RemoveUserOperation(email=email)),
+            applied=EmailNotFoundError,
+        )
+
+    async def __alter_inbounds(
+        self,
+        alterations: list[tuple[str, TypedMessage]],
+        ignored: type[XrayError],
+        window: int,
+    ) -> list[Exception | None]:
+        """sends the alterations with up to `window` of them in flight,
+        they share the channel's http/2 connection"""
+        results = [None] * len(alterations)
+        pending = iter(enumerate(alterations))
+
+        async def worker():
+            for index, (tag, operation) in pending:
+                try:
+                    await self.__alter_inbound(tag, operation, ignored)
+                except ignored:
+                    pass
+                except (XrayError, OSError) as error:
+                    results[index] = error
+
+        await asyncio.gather(*(worker() for _ in range(min(window, len(alterations)))))
+        return results
+
+    async def bulk_add(
+        self, users: Iterable[tuple[str, Account | PreparedAccount]], window: int = 64
+    ) -> list[Exception | None]:
+        """
+        adds many users to inbounds concurrently
+        :param users: pairs of an inbound tag and the account to add to it
+        :param window: max number of requests in flight
+        :return: the error of each addition in order, None if it succeeded
+        or the user already existed
+        """
+        return await self.__alter_inbounds(
+            [
+                (
+                    tag,
+                    Message(
+                        command_pb2.AddUserOperation(
+                            user=user_pb2.User(
+                                level=user.level, email=user.email, account=user.message
+                            )
+                        )
+                    ),
+                )
+                for tag, user in users
+            ],
+            EmailExistsError,
+            window,
+        )
+
+    async def bulk_remove(
+        self, users: Iterable[tuple[str, str]], window: int = 64
+    ) -> list[Exception | None]:
+        """
+        removes many users from inbounds concurrently
+        :param users: pairs of an inbound tag and the email to remove from it
+        :param window: max number of requests in flight
+        :return: the error of each removal in order, None if it succeeded
+        or the user didn't exist
+        """
+        return await self.__alter_inbounds(
+            [
+                (tag, Message(command_pb2.RemoveUserOperation(email=email)))
+                for tag, email in users
+            ],
+            EmailNotFoundError,
+            window,
         )
 
     # TODO: implement add/remove inbound/outbound if necessary
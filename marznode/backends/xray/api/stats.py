@@ -70,8 +70,11 @@ class Stats(XrayAPIBase):
     async def get_sys_stats(self) -> SysStatsResponse:
         """Get System stats from Xray-core"""
         try:
-            stub = command_grpc.StatsServiceStub(self._channel)
-            response = await stub.GetSysStats(command_pb2.SysStatsRequest())
+            response = await self._call(
+                command_grpc.StatsServiceStub,
+                "GetSysStats",
+                command_pb2.SysStatsRequest(),
+            )
 
         except grpclib.exceptions.GRPCError as error:
             raise RelatedError(error) from error
@@ -98,9 +101,10 @@ class Stats(XrayAPIBase):
             pattern: the pattern given directly to xray e.g. `user>>>`
             reset: whether to reset xray statistics or not."""
         try:
-            stub = command_grpc.StatsServiceStub(self._channel)
-            response = await stub.QueryStats(
-                command_pb2.QueryStatsRequest(pattern=pattern, reset=reset)
+            response = await self._call(
+                command_grpc.StatsServiceStub,
+                "QueryStats",
+                command_pb2.QueryStatsRequest(pattern=pattern, reset=reset),
             )
 
         except grpclib.exceptions.GRPCError as error:
@@ -3,7 +3,8 @@
 # pylint: disable=E0611,C0115
 from abc import ABC, abstractmethod
 from enum import Enum
-from typing import Optional
+from functools import lru_cache
+from typing import NamedTuple, Optional
 from uuid import UUID
 
 from pydantic import BaseModel, field_validator, ValidationInfo, ValidationError, Field
@@ -17,6 +18,7 @@ from ..proto.proxy.shadowsocks.config_pb2 import Account as ShadowsocksAccountPb
 from ..proto.proxy.trojan.config_pb2 import Account as TrojanAccountPb2
 from ..proto.proxy.vless.account_pb2 import Account as VLESSAccountPb2
 from ..proto.proxy.vmess.account_pb2 import Account as VMessAccountPb2
+from marznode.config import CREDENTIALS_CACHE_SIZE
 from marznode.utils.key_gen import generate_uuid, generate_password
 
 
@@ -43,6 +45,10 @@ class Account(BaseModel, ABC):
                 return generate_password(seed)
         raise ValidationError("Both password/id and seed are empty")
 
+    def to_dict(self) -> dict:
+        """the account as a client in the settings of an xray inbound"""
+        return self.model_dump(mode="json", exclude={"seed"})
+
     def __repr__(self) -> str:
         return f"<{self.__class__.__name__} {self.email}>"
 
@@ -104,3 +110,38 @@ accounts_map = {
     "vmess": VMessAccount,
     "vless": VLESSAccount,
 }
+
+
+class PreparedAccount(NamedTuple):
+    """an account whose message is built already, usable in place of an Account"""
+
+    email: str
+    message: TypedMessage
+    level: int = 0
+
+
+@lru_cache(maxsize=CREDENTIALS_CACHE_SIZE)
+def account_message(protocol: str, seed: str, flow: str = "") -> TypedMessage:
+    """
+    builds the message of an account, only the first time for each
+    protocol, seed and flow as re-adding users builds the same ones again
+    :return: the message, callers should copy it rather than modify it
+    """
+    return accounts_map[protocol](email="", seed=seed, flow=flow).message
+
+
+def account_client(protocol: str, seed: str, flow: str = "") -> dict:
+    """
+    builds the client of an account for the settings of an xray inbound,
+    without its email, as Account.to_dict would but skipping the validation.
+    only the credentials derived from the seed are cached
+    """
+    if protocol in ("vmess", "vless"):
+        client = {"level": 0, "id": str(generate_uuid(seed))}
+        if protocol == "vless":
+            client["flow"] = flow
+    else:
+        client = {"level": 0, "password": generate_password(seed)}
+        if protocol == "shadowsocks":
+            client["method"] = ShadowsocksMethods.CHACHA20_POLY1305.value
+    return client
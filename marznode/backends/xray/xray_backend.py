@@ -4,7 +4,9 @@ import asyncio
 import json
 import logging
 from collections import defaultdict
+from collections.abc import Callable, Iterable
 
+from marznode.backends._retry import RetryQueue
 from marznode.backends.abstract_backend import VPNBackend
 from marznode.backends.xray._config import XrayConfig
 from marznode.backends.xray._runner import XrayCore
@@ -14,8 +16,15 @@ from marznode.backends.xray.api.exceptions import (
     EmailNotFoundError,
     TagNotFoundError,
 )
-from marznode.backends.xray.api.types.account import accounts_map
-from marznode.config import XRAY_RESTART_ON_FAILURE, XRAY_RESTART_ON_FAILURE_INTERVAL
+from marznode.backends.xray.api.types.account import (
+    PreparedAccount,
+    account_message,
+)
+from marznode.config import (
+    XRAY_API_WINDOW,
+    XRAY_RESTART_ON_FAILURE,
+    XRAY_RESTART_ON_FAILURE_INTERVAL,
+)
 from marznode.models import User, Inbound
 from marznode.storage import BaseStorage
 from marznode.utils.network import find_free_port
@@ -34,6 +43,7 @@ class XrayBackend(VPNBackend):
         config_path: str,
         storage: BaseStorage,
     ):
+        super().__init__()
         self._config = None
         self._inbound_tags = set()
         self._inbounds = list()
@@ -42,6 +52,7 @@ class XrayBackend(VPNBackend):
         self._storage = storage
         self._config_path = config_path
         self._restart_lock = asyncio.Lock()
+        self.retry_queue = RetryQueue(self._api_bulk_remove, self._api_bulk_add)
         asyncio.create_task(self._restart_on_failure())
 
     @property
@@ -66,10 +77,57 @@ class XrayBackend(VPNBackend):
         with open(self._config_path, "w") as f:
             f.write(config)
 
-    async def add_storage_users(self):
+    async def add_storage_users(self) -> int:
+        """
+        puts the stored users in the config so they're live as soon as xray starts
+        :return: the storage generation the config is up to date with
+        """
+        generation = self._storage.generation
+        self.retry_queue.clear()
+        self._config.clear_users()
+        seeded = {
+            inbound.tag: inbound
+            for inbound in self._inbounds
+            if self._config.accepts_users(inbound.tag)
+        }
+        """users are taken one at a time rather than inbound by inbound, so
+        their credentials are still cached when their next inbound needs them"""
+        for user in await self._storage.list_users():
+            for inbound in user.inbounds:
+                if inbound.tag in seeded:
+                    self._config.append_user(user, seeded[inbound.tag])
+        return generation
+
+    async def _catch_up(self, generation: int):
+        """
+        applies the changes made to the storage while xray was starting,
+        through the api as the config was written before them, users of the
+        inbounds that couldn't be put in the config are added as well
+        :param generation: the generation the config is up to date with
+        """
+        seeded = [i for i in self._inbounds if self._config.accepts_users(i.tag)]
+        changes = self._storage.changes_since(generation)
+        if changes is None:
+            logger.warning("too many changes while xray was starting, re-adding users")
+            user_ids = await self._storage.list_user_ids()
+        else:
+            user_ids = {c.user_id for c in changes if c.user_id is not None}
+        additions, removals = [], []
         for inbound in self._inbounds:
-            for user in await self._storage.list_inbound_users(inbound.tag):
-                await self.add_user(user, inbound)
+            if inbound not in seeded:
+                users = await self._storage.list_inbound_users(inbound.tag)
+                additions.extend((user, inbound) for user in users)
+        for user_id in user_ids:
+            if not (user := await self._storage.list_users(user_id)):
+                continue
+            tags = {inbound.tag for inbound in user.inbounds}
+            for inbound in seeded:
+                if inbound.tag in tags:
+                    additions.append((user, inbound))
+                else:
+                    removals.append((user, inbound))
+        await self.bulk_remove(removals)
+        await self.bulk_add(additions)
 
     async def _restart_on_failure(self):
         while True:
@@ -82,7 +140,6 @@ class XrayBackend(VPNBackend):
                 if XRAY_RESTART_ON_FAILURE:
                     await asyncio.sleep(XRAY_RESTART_ON_FAILURE_INTERVAL)
                     await self.start()
-                    await self.add_storage_users()
 
     async def start(self, backend_config: str | None = None):
         if backend_config is None:
@@ -95,8 +152,12 @@ class XrayBackend(VPNBackend):
         self._config.register_inbounds(self._storage)
         self._inbound_tags = {i["tag"] for i in self._config.inbounds}
         self._inbounds = list(self._config.list_inbounds())
+        if self._api is not None:
+            self._api.close()
         self._api = XrayAPI("127.0.0.1", xray_api_port)
+        generation = await self.add_storage_users()
         await self._runner.start(self._config)
+        await self._catch_up(generation)
 
     async def stop(self):
         await self._runner.stop()
@@ -109,40 +170,107 @@ class XrayBackend(VPNBackend):
         # xray_config = backend_config if backend_config else self._config
         await self._restart_lock.acquire()
         try:
+            await self._buffer_usages()
             if not backend_config:
-                return await self._runner.restart(self._config)
+                generation = await self.add_storage_users()
+                await self._runner.restart(self._config)
+                return await self._catch_up(generation)
             await self.stop()
             await self.start(backend_config)
         finally:
             self._restart_lock.release()
 
-    async def add_user(self, user: User, inbound: Inbound):
-        email = f"{user.id}.{user.username}"
-
-        account_class = accounts_map[inbound.protocol]
+    @staticmethod
+    def _account(user: User, inbound: Inbound) -> PreparedAccount:
         flow = inbound.config["flow"] or ""
-        logger.debug(flow)
-        user_account = account_class(
-            email=email,
-            seed=user.key,
-            flow=flow,
+        return PreparedAccount(
+            f"{user.id}.{user.username}",
+            account_message(inbound.protocol, user.key, flow),
         )
 
+    async def add_user(self, user: User, inbound: Inbound):
+        if (user.id, inbound.tag) in self.retry_queue:
+            return self.retry_queue.add(user, inbound)
+        user_account = self._account(user, inbound)
         try:
             await self._api.add_inbound_user(inbound.tag, user_account)
         except (EmailExistsError, TagNotFoundError):
             raise
         except OSError:
-            logger.warning("user addition requested when xray api is down")
+            logger.warning("user addition requested when xray api is down, queued")
+            self.retry_queue.add(user, inbound)
 
     async def remove_user(self, user: User, inbound: Inbound):
+        if (user.id, inbound.tag) in self.retry_queue:
+            return self.retry_queue.remove(user, inbound)
         email = f"{user.id}.{user.username}"
         try:
             await self._api.remove_inbound_user(inbound.tag, email)
         except (EmailNotFoundError, TagNotFoundError):
             raise
         except OSError:
-            logger.warning("user removal requested when xray api is down")
+            logger.warning("user removal requested when xray api is down, queued")
+            self.retry_queue.remove(user, inbound)
+
+    async def _api_bulk_add(
+        self, users: list[tuple[User, Inbound]]
+    ) -> list[Exception | None]:
+        return await self._api.bulk_add(
+            [(inbound.tag, self._account(user, inbound)) for user, inbound in users],
+            XRAY_API_WINDOW,
+        )
+
+    async def _api_bulk_remove(
+        self, users: list[tuple[User, Inbound]]
+    ) -> list[Exception | None]:
+        return await self._api.bulk_remove(
+            [(inbound.tag, f"{user.id}.{user.username}") for user, inbound in users],
+            XRAY_API_WINDOW,
+        )
+
+    async def _bulk_or_queue(
+        self,
+        users: Iterable[tuple[User, Inbound]],
+        operation: Callable,
+        queue: Callable[[User, Inbound], None],
+    ) -> list[Exception | None]:
+        """runs the operation through the api, users which have operations
+        queued already and those xray couldn't be reached for are queued"""
+        users = list(users)
+        results = [None] * len(users)
+        direct = []
+        for index, (user, inbound) in enumerate(users):
+            if (user.id, inbound.tag) in self.retry_queue:
+                queue(user, inbound)
+            else:
+                direct.append(index)
+        queued = len(users) - len(direct)
+        api_results = await operation([users[index] for index in direct])
+        for index, result in zip(direct, api_results):
+            if isinstance(result, OSError):
+                queue(*users[index])
+                queued += 1
+            else:
+                results[index] = result
+        if queued:
+            logger.warning(
+                "queued %i of %i users as xray api is down", queued, len(users)
+            )
+        return results
+
+    async def bulk_add(
+        self, users: Iterable[tuple[User, Inbound]]
+    ) -> list[Exception | None]:
+        return await self._bulk_or_queue(
+            users, self._api_bulk_add, self.retry_queue.add
+        )
+
+    async def bulk_remove(
+        self, users: Iterable[tuple[User, Inbound]]
+    ) -> list[Exception | None]:
+        return await self._bulk_or_queue(
+            users, self._api_bulk_remove, self.retry_queue.remove
+        )
 
     async def get_usages(self, reset: bool = True) -> dict[int, int]:
         try:
@@ -153,7 +281,7 @@ class XrayBackend(VPNBackend):
         for stat in api_stats:
             uid = int(stat.name.split(".")[0])
             stats[uid] += stat.value
-        return stats
+        return self._merge_buffered_usages(stats)
 
     async def get_logs(self, include_buffer: bool = True):
         if include_buffer:
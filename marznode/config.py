@@ -20,6 +20,11 @@ XRAY_RESTART_ON_FAILURE = config("XRAY_RESTART_ON_FAILURE", cast=bool, default=F
 XRAY_RESTART_ON_FAILURE_INTERVAL = config(
     "XRAY_RESTART_ON_FAILURE_INTERVAL", cast=int, default=0
 )
+XRAY_API_WINDOW = config("XRAY_API_WINDOW", cast=int, default=64)
+XRAY_API_CHANNELS = config("XRAY_API_CHANNELS", cast=int, default=4)
+XRAY_API_TIMEOUT = config("XRAY_API_TIMEOUT", cast=float, default=5)
+XRAY_API_RETRIES = config("XRAY_API_RETRIES", cast=int, default=3)
+XRAY_API_KEEPALIVE = config("XRAY_API_KEEPALIVE", cast=float, default=300)
 
 HYSTERIA_ENABLED = config("HYSTERIA_ENABLED", cast=bool, default=False)
 HYSTERIA_EXECUTABLE_PATH = config(
@@ -46,6 +51,14 @@ SING_BOX_USER_MODIFICATION_INTERVAL = config(
     "SING_BOX_USER_MODIFICATION_INTERVAL", cast=int, default=30
 )
 
+SYNC_USERS_BATCH_SIZE = config("SYNC_USERS_BATCH_SIZE", cast=int, default=256)
+SYNC_USERS_CONCURRENCY = config("SYNC_USERS_CONCURRENCY", cast=int, default=32)
+BACKEND_USAGE_TIMEOUT = config("BACKEND_USAGE_TIMEOUT", cast=float, default=5)
+USERS_DIGEST_BUCKETS = config("USERS_DIGEST_BUCKETS", cast=int, default=1024)
+USERS_STATS_CHUNK_SIZE = config("USERS_STATS_CHUNK_SIZE", cast=int, default=10000)
+USAGE_HARVEST_INTERVAL = config("USAGE_HARVEST_INTERVAL", cast=int, default=0)
+USAGE_ACCUMULATOR_PATH = config("USAGE_ACCUMULATOR_PATH", default="./usages.bin")
+
 
 SSL_CERT_FILE = config("SSL_CERT_FILE", default="./ssl_cert.pem")
 SSL_KEY_FILE = config("SSL_KEY_FILE", default="./ssl_key.pem")
@@ -54,6 +67,21 @@ SSL_CLIENT_CERT_FILE = config("SSL_CLIENT_CERT_FILE", default="")
 DEBUG = config("DEBUG", cast=bool, default=False)
 
 
+class StorageBackend(Enum):
+    MEMORY = "memory"
+    SQLITE = "sqlite"
+    COLUMNAR = "columnar"
+
+
+STORAGE_BACKEND = config(
+    "STORAGE_BACKEND", cast=StorageBackend, default=StorageBackend.MEMORY
+)
+SQLITE_STORAGE_PATH = config("SQLITE_STORAGE_PATH", default="./marznode.db")
+STORAGE_SNAPSHOT_PATH = config("STORAGE_SNAPSHOT_PATH", default="")
+STORAGE_SNAPSHOT_INTERVAL = config("STORAGE_SNAPSHOT_INTERVAL", cast=int, default=300)
+STORAGE_JOURNAL_SIZE = config("STORAGE_JOURNAL_SIZE", cast=int, default=100_000)
+
+
 class AuthAlgorithm(Enum):
     PLAIN = "plain"
     XXH128 = "xxh128"
@@ -62,3 +90,4 @@ class AuthAlgorithm(Enum):
 AUTH_GENERATION_ALGORITHM = config(
     "AUTH_GENERATION_ALGORITHM", cast=AuthAlgorithm, default=AuthAlgorithm.XXH128
 )
+CREDENTIALS_CACHE_SIZE = config("CREDENTIALS_CACHE_SIZE", cast=int, default=10_000)
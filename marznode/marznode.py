@@ -25,7 +25,13 @@ from marznode.config import (
     SING_BOX_CONFIG_PATH,
 )
 from marznode.service import MarzService
-from marznode.storage import MemoryStorage
+from marznode.storage import (
+    ColumnarStorage,
+    MemoryStorage,
+    SQLiteStorage,
+    StorageSnapshotter,
+)
+from marznode.usage import UsageAccumulator, UsageCollector, UsageHarvester
 from marznode.utils.ssl import generate_keypair, create_secure_context
 
 logger = logging.getLogger(__name__)
@@ -51,7 +57,23 @@ async def main():
             trusted=config.SSL_CLIENT_CERT_FILE,
         )
 
-    storage = MemoryStorage()
+    if config.STORAGE_BACKEND == config.StorageBackend.SQLITE:
+        storage = SQLiteStorage(config.SQLITE_STORAGE_PATH)
+    elif config.STORAGE_BACKEND == config.StorageBackend.COLUMNAR:
+        storage = ColumnarStorage()
+    else:
+        storage = MemoryStorage()
+    snapshotter = None
+    if (
+        config.STORAGE_SNAPSHOT_PATH
+        and config.STORAGE_BACKEND != config.StorageBackend.SQLITE
+    ):
+        """restore users before the backends start so they're served right away"""
+        snapshotter = StorageSnapshotter(
+            storage, config.STORAGE_SNAPSHOT_PATH, config.STORAGE_SNAPSHOT_INTERVAL
+        )
+        snapshotter.restore()
+        snapshotter.start()
     backends = dict()
     if XRAY_ENABLED:
         xray_backend = XrayBackend(
@@ -75,7 +97,16 @@ async def main():
         await sing_box_backend.start()
         backends.update({"sing-box": sing_box_backend})
 
-    server = Server([MarzService(storage, backends), Health()])
+    harvester = None
+    if config.USAGE_HARVEST_INTERVAL:
+        harvester = UsageHarvester(
+            UsageCollector(backends, config.BACKEND_USAGE_TIMEOUT),
+            UsageAccumulator(config.USAGE_ACCUMULATOR_PATH),
+            config.USAGE_HARVEST_INTERVAL,
+        )
+        harvester.start()
+
+    server = Server([MarzService(storage, backends, harvester), Health()])
 
     with graceful_exit([server]):
         await server.start(config.SERVICE_ADDRESS, config.SERVICE_PORT, ssl=ssl_context)
@@ -83,3 +114,7 @@ async def main():
             "Node service running on %s:%i", config.SERVICE_ADDRESS, config.SERVICE_PORT
         )
         await server.wait_closed()
+    if snapshotter:
+        await snapshotter.dump()
+    if harvester:
+        await harvester.stop()
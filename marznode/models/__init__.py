@@ -1,4 +1,2 @@
 from .inbound import Inbound
 from .user import User
-
-User.model_rebuild()
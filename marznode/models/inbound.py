@@ -1,7 +1,13 @@
-from pydantic import BaseModel
+class Inbound:
+    """an inbound of a backend, instances are registered once per tag
+    in the storage and shared by all of the inbound's users"""
 
+    __slots__ = ("tag", "protocol", "config")
 
-class Inbound(BaseModel):
-    tag: str
-    protocol: str
-    config: dict
+    def __init__(self, *, tag: str, protocol: str, config: dict):
+        self.tag = tag
+        self.protocol = protocol
+        self.config = config
+
+    def __repr__(self) -> str:
+        return f"Inbound(tag={self.tag!r}, protocol={self.protocol!r})"
@@ -1,13 +1,31 @@
+from collections.abc import Sequence
 from typing import TYPE_CHECKING
 
-from pydantic import BaseModel
-
 if TYPE_CHECKING:
     from marznode.models import Inbound
 
 
-class User(BaseModel):
-    id: int
-    username: str
-    key: str
-    inbounds: list["Inbound"] = []
+class User:
+    """a user of the node, kept free of validation since it's built for
+    every synced user, pydantic models are used where input is parsed"""
+
+    __slots__ = ("id", "username", "key", "inbounds")
+
+    def __init__(
+        self,
+        *,
+        id: int,
+        username: str,
+        key: str,
+        inbounds: Sequence["Inbound"] = (),
+    ):
+        self.id = id
+        self.username = username
+        self.key = key
+        self.inbounds = inbounds
+
+    def __repr__(self) -> str:
+        return (
+            f"User(id={self.id!r}, username={self.username!r}, "
+            f"inbounds={[i.tag for i in self.inbounds]!r})"
+        )
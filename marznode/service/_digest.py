@@ -0,0 +1,70 @@
+"""Keeps content digests of users so a client can tell which ones differ"""
+
+from collections.abc import Iterable
+
+import xxhash
+
+from marznode.models import User
+
+
+def user_digest(user_id: int, username: str, key: str, tags: Iterable[str]) -> int:
+    """
+    digests the parts of a user which the client syncs
+    :param user_id: id of the user
+    :param username: username of the user
+    :param key: key of the user
+    :param tags: inbound tags of the user
+    :return: the 64-bit digest
+    """
+    content = "\n".join([str(user_id), username, key, *sorted(tags)])
+    return xxhash.xxh64_intdigest(content.encode())
+
+
+class UserDigests:
+    """per-user digests rolled up into buckets by `id % bucket_count`
+    a bucket's digest is the xor of its users' so it's updated in O(1)"""
+
+    def __init__(self, bucket_count: int):
+        self.bucket_count = bucket_count
+        self.buckets = [0] * bucket_count
+        self._digests: dict[int, int] = {}
+        self._bucket_users: list[set[int]] = [set() for _ in range(bucket_count)]
+
+    def get(self, user_id: int) -> int | None:
+        return self._digests.get(user_id)
+
+    def update(self, user_id: int, digest: int | None) -> None:
+        """sets the digest of a user, None removes the user"""
+        bucket = user_id % self.bucket_count
+        if (old := self._digests.pop(user_id, None)) is not None:
+            self.buckets[bucket] ^= old
+            self._bucket_users[bucket].discard(user_id)
+        if digest is not None:
+            self._digests[user_id] = digest
+            self.buckets[bucket] ^= digest
+            self._bucket_users[bucket].add(user_id)
+
+    def update_user(self, user_id: int, user: User | None) -> None:
+        """sets the digest of a user from its stored state"""
+        if user is None:
+            return self.update(user_id, None)
+        self.update(
+            user_id,
+            user_digest(
+                user.id, user.username, user.key, (i.tag for i in user.inbounds)
+            ),
+        )
+
+    def rebuild(self, users: Iterable[User]) -> None:
+        self.buckets = [0] * self.bucket_count
+        self._digests = {}
+        self._bucket_users = [set() for _ in range(self.bucket_count)]
+        for user in users:
+            self.update_user(user.id, user)
+
+    def users_in_buckets(self, buckets: Iterable[int]) -> set[int]:
+        users = set()
+        for bucket in buckets:
+            if 0 <= bucket < self.bucket_count:
+                users |= self._bucket_users[bucket]
+        return users
@@ -0,0 +1,42 @@
+"""Keeps harvested usages until the client acknowledges receiving them"""
+
+from collections import defaultdict
+
+
+class UsageLedger:
+    """usages are recorded under increasing sequence numbers and are
+    dropped only once a sequence at least as large is acknowledged"""
+
+    def __init__(self):
+        self._sequence = 0
+        self._entries: dict[int, dict[int, int]] = {}
+
+    @property
+    def sequence(self) -> int:
+        return self._sequence
+
+    def record(self, usages: dict[int, int]) -> int:
+        """
+        adds freshly harvested usages to the ledger
+        :param usages: usages by user id
+        :return: the sequence the usages are recorded under
+        """
+        self._sequence += 1
+        if usages:
+            self._entries[self._sequence] = usages
+        return self._sequence
+
+    def acknowledge(self, sequence: int) -> None:
+        """drops usages recorded under sequence or an earlier one"""
+        for recorded in [s for s in self._entries if s <= sequence]:
+            del self._entries[recorded]
+
+    def pending(self) -> dict[int, int]:
+        """sums up all the unacknowledged usages"""
+        if len(self._entries) == 1:
+            return next(iter(self._entries.values()))
+        usages = defaultdict(int)
+        for entry in self._entries.values():
+            for uid, usage in entry.items():
+                usages[uid] += usage
+        return usages
@@ -0,0 +1,99 @@
+"""Converts between the nested and the packed (columnar) forms of messages"""
+
+from collections.abc import Iterable
+
+from marznode.models import User
+from .service_pb2 import (
+    PackedUsersData,
+    PackedUsersStats,
+    UserData,
+    UsersData,
+    UsersDelta,
+    UsersStats,
+)
+
+UserUpdate = tuple[User, list[str]]
+"""a user as sent by the client, along with the inbound tags it should have"""
+
+
+def unpack_user(user_data: UserData) -> UserUpdate:
+    user = user_data.user
+    return (
+        User(id=user.id, username=user.username, key=user.key),
+        [i.tag for i in user_data.inbounds],
+    )
+
+
+def unpack_users(message: UsersData | UsersDelta) -> list[UserUpdate]:
+    """
+    reads the users of a message whether sent nested, packed or both
+    :param message: the message containing users
+    :return: list of users and their inbound tags
+    """
+    updates = [unpack_user(user_data) for user_data in message.users_data]
+    packed = message.packed
+    tags = packed.tags
+    indices = packed.inbound_indices
+    offset = 0
+    for user_id, username, key, count in zip(
+        packed.ids, packed.usernames, packed.keys, packed.inbound_counts
+    ):
+        user_tags = [tags[i] for i in indices[offset : offset + count]]
+        offset += count
+        updates.append((User(id=user_id, username=username, key=key), user_tags))
+    return updates
+
+
+def pack_users(updates: Iterable[UserUpdate]) -> PackedUsersData:
+    """builds the packed form of a list of users"""
+    tag_indices = {}
+    ids, usernames, keys, counts, indices = [], [], [], [], []
+    for user, tags in updates:
+        ids.append(user.id)
+        usernames.append(user.username)
+        keys.append(user.key)
+        counts.append(len(tags))
+        indices.extend(tag_indices.setdefault(tag, len(tag_indices)) for tag in tags)
+    return PackedUsersData(
+        tags=list(tag_indices),
+        ids=ids,
+        usernames=usernames,
+        keys=keys,
+        inbound_counts=counts,
+        inbound_indices=indices,
+    )
+
+
+def users_stats(
+    usages: dict[int, int] | Iterable[tuple[int, int]],
+    packed: bool = False,
+    incomplete_backends: Iterable[str] = (),
+    sequence: int = 0,
+) -> UsersStats:
+    """
+    builds a UsersStats message
+    :param usages: usages by user id
+    :param packed: fills UsersStats.packed instead of users_stats if set
+    :param incomplete_backends: backends which haven't reported in time
+    :param sequence: ledger sequence of an acknowledged collection
+    :return: the message
+    """
+    if isinstance(usages, dict):
+        usages = usages.items()
+    if packed:
+        uids, values = [], []
+        for uid, usage in usages:
+            uids.append(uid)
+            values.append(usage)
+        return UsersStats(
+            packed=PackedUsersStats(uids=uids, usages=values),
+            incomplete_backends=incomplete_backends,
+            sequence=sequence,
+        )
+    return UsersStats(
+        users_stats=[
+            UsersStats.UserStats(uid=uid, usage=usage) for uid, usage in usages
+        ],
+        incomplete_backends=incomplete_backends,
+        sequence=sequence,
+    )
@@ -3,15 +3,35 @@ The grpc Service to add/update/delete users
 Right now it only supports Xray but that is subject to change
 """
 
+import asyncio
+import gc
 import json
 import logging
+import time
 from collections import defaultdict
+from collections.abc import AsyncIterator, Iterable, Iterator
+from contextlib import aclosing
+from dataclasses import dataclass
+from itertools import islice
 
 from grpclib import GRPCError, Status
 from grpclib.server import Stream
 
 from marznode.backends.abstract_backend import VPNBackend
+from marznode.config import (
+    SYNC_USERS_BATCH_SIZE,
+    SYNC_USERS_CONCURRENCY,
+    BACKEND_USAGE_TIMEOUT,
+    USERS_DIGEST_BUCKETS,
+    USERS_STATS_CHUNK_SIZE,
+)
 from marznode.storage import BaseStorage
+from marznode.usage import UsageCollector, UsageHarvester
+from marznode.utils.locks import KeyedLock
+from marznode.utils.process import rss_bytes
+from ._digest import UserDigests, user_digest
+from ._ledger import UsageLedger
+from ._packing import UserUpdate, unpack_user, unpack_users, users_stats
 from .service_grpc import MarzServiceBase
 from .service_pb2 import (
     BackendConfig as BackendConfig_pb2,
@@ -19,6 +39,7 @@ from .service_pb2 import (
     BackendLogsRequest,
     RestartBackendRequest,
     BackendStats,
+    NodeStats,
 )
 from .service_pb2 import (
     UserData,
@@ -28,47 +49,160 @@ from .service_pb2 import (
     Inbound,
     UsersStats,
     LogLine,
+    UsersDigest,
+    UsersDelta,
+    UsersStatsRequest,
+    UsersStatsSubscription,
+    UsersStatsAck,
 )
 from ..models import User, Inbound as InboundModel
 
 logger = logging.getLogger(__name__)
 
+_STREAM_END = object()
+
+
+async def _batched(stream: Stream, max_size: int) -> AsyncIterator[list]:
+    """
+    yields messages of the stream in lists of at most max_size
+    a batch is cut as soon as no more messages are buffered, so a slow
+    client never waits for a batch to fill up
+    """
+    queue = asyncio.Queue(maxsize=max_size)
+
+    async def read():
+        cancelled = False
+        try:
+            async for message in stream:
+                await queue.put(message)
+        except asyncio.CancelledError:
+            """the batches aren't consumed anymore, so there's
+            nobody to make room in the queue for the end"""
+            cancelled = True
+            raise
+        finally:
+            if not cancelled:
+                await queue.put(_STREAM_END)
+
+    reader = asyncio.create_task(read())
+    try:
+        ended = False
+        while not ended:
+            message = await queue.get()
+            if message is _STREAM_END:
+                break
+            batch = [message]
+            while len(batch) < max_size and not queue.empty():
+                message = queue.get_nowait()
+                if message is _STREAM_END:
+                    ended = True
+                    break
+                batch.append(message)
+            yield batch
+        await reader
+    finally:
+        reader.cancel()
+
+
+def _chunks(items: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(items)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+@dataclass
+class SyncCounters:
+    """cumulative throughput counters of SyncUsers streams"""
+
+    streams: int = 0
+    messages: int = 0
+    batches: int = 0
+    seconds: float = 0.0
+
+    @property
+    def messages_per_second(self) -> float:
+        return self.messages / self.seconds if self.seconds else 0.0
+
+    @property
+    def average_batch_size(self) -> float:
+        return self.messages / self.batches if self.batches else 0.0
+
 
 class MarzService(MarzServiceBase):
     """Add/Update/Delete users based on calls from the client"""
 
-    def __init__(self, storage: BaseStorage, backends: dict[str, VPNBackend]):
+    def __init__(
+        self,
+        storage: BaseStorage,
+        backends: dict[str, VPNBackend],
+        harvester: UsageHarvester | None = None,
+    ):
         self._backends = backends
         self._storage = storage
+        self._harvester = harvester
+        self._collector = UsageCollector(backends, BACKEND_USAGE_TIMEOUT)
+        self._sync_semaphore = asyncio.Semaphore(SYNC_USERS_CONCURRENCY)
+        self._user_locks = KeyedLock()
+        """serializes the read-modify-write updates of each user across streams"""
+        self.sync_counters = SyncCounters()
+        self._usage_ledger = UsageLedger()
+        self._usage_tickets: dict[int, int] = {}
+        """tickets of the harvested usages recorded under ledger sequences"""
+        self._digest = UserDigests(USERS_DIGEST_BUCKETS)
+        self._digest_generation: int | None = None
+        """the storage generation the digests are up to date with"""
+        self._tag_backends: dict[str, VPNBackend] = {}
+        self._index_tags()
+
+    def _index_tags(self) -> None:
+        """maps inbound tags to their backends, should be called whenever
+        the inbounds of a backend change"""
+        self._tag_backends = {
+            inbound.tag: backend
+            for backend in self._backends.values()
+            for inbound in backend.list_inbounds()
+        }
 
     def _resolve_tag(self, inbound_tag: str) -> VPNBackend:
-        for backend in self._backends.values():
-            if backend.contains_tag(inbound_tag):
-                return backend
-        raise
+        try:
+            return self._tag_backends[inbound_tag]
+        except KeyError:
+            raise GRPCError(
+                Status.NOT_FOUND, f"Inbound `{inbound_tag}` doesn't exist"
+            ) from None
 
-    async def _add_user(self, user: User, inbounds: list[Inbound]):
+    def _group_by_backend(
+        self, inbounds: list[InboundModel]
+    ) -> dict[VPNBackend, list[InboundModel]]:
+        groups = defaultdict(list)
         for inbound in inbounds:
-            backend = self._resolve_tag(inbound.tag)
-            logger.debug("adding user `%s` to inbound `%s`", user.username, inbound.tag)
-            await backend.add_user(user, inbound)
+            groups[self._resolve_tag(inbound.tag)].append(inbound)
+        return groups
+
+    async def _add_user(self, user: User, inbounds: list[InboundModel]):
+        for backend, backend_inbounds in self._group_by_backend(inbounds).items():
+            for inbound in backend_inbounds:
+                logger.debug(
+                    "adding user `%s` to inbound `%s`", user.username, inbound.tag
+                )
+                await backend.add_user(user, inbound)
 
     async def _remove_user(self, user: User, inbounds: list[InboundModel]):
-        for inbound in inbounds:
-            backend = self._resolve_tag(inbound.tag)
-            logger.debug(
-                "removing user `%s` from inbound `%s`", user.username, inbound.tag
-            )
-            await backend.remove_user(user, inbound)
+        for backend, backend_inbounds in self._group_by_backend(inbounds).items():
+            for inbound in backend_inbounds:
+                logger.debug(
+                    "removing user `%s` from inbound `%s`", user.username, inbound.tag
+                )
+                await backend.remove_user(user, inbound)
 
-    async def _update_user(self, user_data: UserData):
-        user = user_data.user
-        user = User(id=user.id, username=user.username, key=user.key)
+    async def _update_user(self, user: User, inbound_tags: list[str]):
+        for tag in inbound_tags:
+            """the storage would silently skip tags it doesn't know"""
+            self._resolve_tag(tag)
         storage_user = await self._storage.list_users(user.id)
-        if not storage_user and len(user_data.inbounds) > 0:
+        if not storage_user and len(inbound_tags) > 0:
             """add the user in case there isn't any currently
             and the inbounds is non-empty"""
-            inbound_tags = [i.tag for i in user_data.inbounds]
             inbound_additions = await self._storage.list_inbounds(tag=inbound_tags)
             await self._add_user(user, inbound_additions)
             await self._storage.update_user_inbounds(
@@ -76,31 +210,71 @@ class MarzService(MarzServiceBase):
                 [i for i in inbound_additions],
             )
             return
-        elif not user_data.inbounds and storage_user:
+        elif not inbound_tags and storage_user:
             """remove in case we have the user but client has sent
             us an empty list of inbounds"""
             await self._remove_user(storage_user, storage_user.inbounds)
             return await self._storage.remove_user(user)
-        elif not user_data.inbounds and not storage_user:
+        elif not inbound_tags and not storage_user:
             """we're asked to remove a user which we don't have, just pass."""
             return
 
         """otherwise synchronize the user with what 
         the client has sent us"""
         storage_tags = {i.tag for i in storage_user.inbounds}
-        new_tags = {i.tag for i in user_data.inbounds}
-        added_tags = new_tags - storage_tags
-        removed_tags = storage_tags - new_tags
+        new_tags = set(inbound_tags)
         new_inbounds = await self._storage.list_inbounds(tag=list(new_tags))
-        added_inbounds = await self._storage.list_inbounds(tag=list(added_tags))
-        removed_inbounds = await self._storage.list_inbounds(tag=list(removed_tags))
+        added_inbounds = [i for i in new_inbounds if i.tag not in storage_tags]
+        removed_inbounds = [i for i in storage_user.inbounds if i.tag not in new_tags]
         await self._remove_user(storage_user, removed_inbounds)
         await self._add_user(storage_user, added_inbounds)
         await self._storage.update_user_inbounds(storage_user, new_inbounds)
 
+    async def _update_users(self, updates: list[UserUpdate]):
+        """applies a batch of updates, updates of different users run
+        concurrently while updates of the same user keep their order
+        and never interleave with ones from other streams"""
+        per_user = defaultdict(list)
+        for update in updates:
+            per_user[update[0].id].append(update)
+
+        async def apply(user_updates: list[UserUpdate]):
+            user_id = user_updates[0][0].id
+            async with self._user_locks.acquire(user_id), self._sync_semaphore:
+                for user, inbound_tags in user_updates:
+                    await self._update_user(user, inbound_tags)
+
+        """every user's updates are seen through before the first error is
+        raised, so none is left running once the call has failed"""
+        results = await asyncio.gather(
+            *(apply(u) for u in per_user.values()), return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+
     async def SyncUsers(self, stream: Stream[UserData, Empty]) -> None:
-        async for user_data in stream:
-            await self._update_user(user_data)
+        started = time.monotonic()
+        messages, batches = 0, 0
+        try:
+            async with aclosing(_batched(stream, SYNC_USERS_BATCH_SIZE)) as batched:
+                async for users_data in batched:
+                    await self._update_users([unpack_user(u) for u in users_data])
+                    messages += len(users_data)
+                    batches += 1
+        finally:
+            elapsed = time.monotonic() - started
+            counters = self.sync_counters
+            counters.streams += 1
+            counters.messages += messages
+            counters.batches += batches
+            counters.seconds += elapsed
+            logger.debug(
+                "synced %i user updates in %i batches within %.2fs",
+                messages,
+                batches,
+                elapsed,
+            )
 
     async def FetchBackends(
         self,
@@ -125,32 +299,260 @@ class MarzService(MarzServiceBase):
         self,
         stream: Stream[UsersData, Empty],
     ) -> None:
-        users_data = (await stream.recv_message()).users_data
-        for user_data in users_data:
-            await self._update_user(user_data)
-        user_ids = {user_data.user.id for user_data in users_data}
-        for storage_user in await self._storage.list_users():
-            if storage_user.id not in user_ids:
-                await self._remove_user(storage_user, storage_user.inbounds)
-                await self._storage.remove_user(storage_user)
+        updates = unpack_users(await stream.recv_message())
+        user_ids = {user.id for user, _ in updates}
+        removed_ids = set(await self._storage.list_user_ids()) - user_ids
+        await self._bulk_update_users(updates, removed_ids)
         await stream.send_message(Empty())
 
-    async def FetchUsersStats(self, stream: Stream[Empty, UsersStats]) -> None:
+    async def _bulk_update_users(
+        self, updates: list[UserUpdate], removed_ids: set[int]
+    ) -> None:
+        """applies a batch of updates and removals to the storage in one go,
+        then hands the resulting inbound membership changes to the backends,
+        users are removed by the credentials they were stored with"""
+        async with self._user_locks.acquire_many(
+            {user.id for user, _ in updates} | removed_ids
+        ):
+            inbounds = {i.tag: i for i in await self._storage.list_inbounds()}
+            users = {user.id: user for user, _ in updates}
+
+            changes = await self._storage.bulk_upsert_users(
+                [
+                    (user, [inbounds[tag] for tag in tags if tag in inbounds])
+                    for user, tags in updates
+                ]
+            )
+            removals = await self._storage.bulk_remove_users(removed_ids)
+            for tag, user_ids in removals.removed.items():
+                changes.removed[tag] |= user_ids
+            changes.previous.update(removals.previous)
+
+            await self._run_backend_operations(
+                "bulk_remove",
+                (
+                    (changes.previous[user_id], inbounds[tag])
+                    for tag, user_ids in changes.removed.items()
+                    if tag in inbounds
+                    for user_id in user_ids
+                ),
+            )
+            await self._run_backend_operations(
+                "bulk_add",
+                (
+                    (users[user_id], inbounds[tag])
+                    for tag, user_ids in changes.added.items()
+                    for user_id in user_ids
+                ),
+            )
+
+    async def _run_backend_operations(
+        self, operation: str, memberships: Iterable[tuple[User, InboundModel]]
+    ) -> None:
+        """hands the memberships to the bulk_add or bulk_remove of their
+        backends, which run concurrently, and logs the failed ones"""
+        per_backend = defaultdict(list)
+        for user, inbound in memberships:
+            per_backend[self._resolve_tag(inbound.tag)].append((user, inbound))
+
+        async def run(backend: VPNBackend, backend_memberships: list):
+            results = await getattr(backend, operation)(backend_memberships)
+            errors = [error for error in results if error is not None]
+            if errors:
+                logger.warning(
+                    "%s failed for %i of %i users of %s, e.g. %r",
+                    operation,
+                    len(errors),
+                    len(results),
+                    backend.backend_type,
+                    errors[0],
+                )
+
+        await asyncio.gather(*(run(b, m) for b, m in per_backend.items()))
+
+    async def _users_digest(self) -> UserDigests:
+        """returns the digests after catching up with the storage's changes,
+        changes to inbounds e.g. by a backend restart need a full rebuild"""
+        generation = self._storage.generation
+        changes = None
+        if self._digest_generation is not None:
+            changes = self._storage.changes_since(self._digest_generation)
+        if changes is None or any(change.user_id is None for change in changes):
+            self._digest.rebuild(await self._storage.list_users())
+        else:
+            for user_id in {change.user_id for change in changes}:
+                self._digest.update_user(
+                    user_id, await self._storage.list_users(user_id)
+                )
+        self._digest_generation = generation
+        return self._digest
+
+    async def FetchUsersDigest(self, stream: Stream[Empty, UsersDigest]) -> None:
         await stream.recv_message()
-        all_stats = defaultdict(int)
+        digest = await self._users_digest()
+        await stream.send_message(
+            UsersDigest(bucket_count=digest.bucket_count, buckets=digest.buckets)
+        )
+
+    async def RepopulateUsersDelta(self, stream: Stream[UsersDelta, Empty]) -> None:
+        delta = await stream.recv_message()
+        updates = unpack_users(delta)
+        digest = await self._users_digest()
+        changed_users = []
+        for user, inbound_tags in updates:
+            new_digest = user_digest(user.id, user.username, user.key, inbound_tags)
+            if digest.get(user.id) != new_digest:
+                changed_users.append((user, inbound_tags))
+        sent_ids = {user.id for user, _ in updates}
+        removed_ids = digest.users_in_buckets(delta.buckets) - sent_ids
+        """digests cover the username and key, users whose credentials changed
+        are replaced in all of their inbounds by _bulk_update_users"""
+        await self._bulk_update_users(changed_users, removed_ids)
+        logger.debug(
+            "repopulated %i changed users out of %i sent",
+            len(changed_users),
+            len(updates),
+        )
+        await stream.send_message(Empty())
+
+    async def _collect_usages(
+        self,
+    ) -> AsyncIterator[tuple[str, dict[int, int] | None]]:
+        """yields usages by the source they come from, backend names or
+        the harvester if usages are harvested in the background, harvested
+        usages are settled once the next item is asked for"""
+        if self._harvester is not None:
+            ticket, usages = self._harvester.take()
+            try:
+                yield "harvester", usages
+            except GeneratorExit:
+                self._harvester.give_back(ticket)
+                raise
+            await self._harvester.settle([ticket])
+            return
+        async for result in self._collector.collect():
+            yield result
+
+    async def _gather_usages(self) -> tuple[dict[int, int], list[str], int | None]:
+        """
+        :return: the usages, the backends which didn't report theirs and
+        for harvested usages the ticket to settle them with, None otherwise
+        """
+        if self._harvester is not None:
+            ticket, usages = self._harvester.take()
+            return usages, [], ticket
+        usages, incomplete_backends = await self._collector.gather()
+        return usages, incomplete_backends, None
 
-        for backend in self._backends.values():
-            stats = await backend.get_usages()
+    def _record_usages(self, usages: dict[int, int], ticket: int | None) -> int:
+        """records usages in the ledger, to be sent until acknowledged
+        :return: the sequence they're recorded under
+        """
+        sequence = self._usage_ledger.record(usages)
+        if ticket is not None:
+            self._usage_tickets[sequence] = ticket
+        return sequence
 
-            for user, usage in stats.items():
-                all_stats[user] += usage
+    async def _acknowledge_usages(self, sequence: int) -> None:
+        """drops usages the client confirmed having got, harvested ones
+        are then dropped from the accumulator as well"""
+        self._usage_ledger.acknowledge(sequence)
+        tickets = [t for s, t in self._usage_tickets.items() if s <= sequence]
+        if tickets:
+            self._usage_tickets = {
+                s: t for s, t in self._usage_tickets.items() if s > sequence
+            }
+            await self._harvester.settle(tickets)
+
+    async def _send_usages(
+        self, stream: Stream, message: UsersStats, ticket: int | None
+    ) -> None:
+        """sends usages the client won't acknowledge, harvested ones are
+        settled once sent or given back if they couldn't be"""
+        try:
+            await stream.send_message(message)
+        except BaseException:
+            if ticket is not None:
+                self._harvester.give_back(ticket)
+            raise
+        if ticket is not None:
+            await self._harvester.settle([ticket])
+
+    async def FetchUsersStats(
+        self, stream: Stream[UsersStatsRequest, UsersStats]
+    ) -> None:
+        request = await stream.recv_message()
+        sequence = 0
+        if request.HasField("acknowledge"):
+            await self._acknowledge_usages(request.acknowledge)
+        all_stats, incomplete_backends, ticket = await self._gather_usages()
+        if request.HasField("acknowledge"):
+            """keep the usages until the client confirms it has got them"""
+            sequence = self._record_usages(all_stats, ticket)
+            all_stats = self._usage_ledger.pending()
+            ticket = None
 
         logger.debug(all_stats)
-        user_stats = [
-            UsersStats.UserStats(uid=uid, usage=usage)
-            for uid, usage in all_stats.items()
-        ]
-        await stream.send_message(UsersStats(users_stats=user_stats))
+        await self._send_usages(
+            stream,
+            users_stats(all_stats, request.packed, incomplete_backends, sequence),
+            ticket,
+        )
+
+    async def AcknowledgeUsersStats(self, stream: Stream[UsersStatsAck, Empty]) -> None:
+        ack = await stream.recv_message()
+        await self._acknowledge_usages(ack.sequence)
+        await stream.send_message(Empty())
+
+    async def FetchUsersStatsChunked(
+        self, stream: Stream[UsersStatsRequest, UsersStats]
+    ) -> None:
+        request = await stream.recv_message()
+        chunk_size = request.chunk_size or USERS_STATS_CHUNK_SIZE
+        incomplete_backends = []
+
+        async with aclosing(self._collect_usages()) as collected:
+            async for backend_name, stats in collected:
+                if stats is None:
+                    incomplete_backends.append(backend_name)
+                    continue
+                for chunk in _chunks(stats.items(), chunk_size):
+                    await stream.send_message(users_stats(chunk, request.packed))
+
+        if incomplete_backends:
+            await stream.send_message(
+                UsersStats(incomplete_backends=incomplete_backends)
+            )
+
+    async def StreamUsersStats(
+        self, stream: Stream[UsersStatsSubscription, UsersStats]
+    ) -> None:
+        subscription = await stream.recv_message()
+        interval = max(subscription.interval, 1)
+        loop = asyncio.get_running_loop()
+        next_push = loop.time() + interval
+        while True:
+            await asyncio.sleep(next_push - loop.time())
+            """schedule from the planned time so pushes don't drift, but
+            don't try to catch up when a collection took too long"""
+            next_push = max(next_push + interval, loop.time())
+
+            all_stats, incomplete_backends, ticket = await self._gather_usages()
+            sequence = 0
+            if subscription.acknowledged:
+                sequence = self._record_usages(all_stats, ticket)
+                all_stats = self._usage_ledger.pending()
+                ticket = None
+            await self._send_usages(
+                stream,
+                users_stats(
+                    ((uid, usage) for uid, usage in all_stats.items() if usage),
+                    subscription.packed,
+                    incomplete_backends,
+                    sequence,
+                ),
+                ticket,
+            )
 
     async def StreamBackendLogs(
         self, stream: Stream[BackendLogsRequest, LogLine]
@@ -176,7 +578,12 @@ class MarzService(MarzServiceBase):
     ) -> None:
         message = await stream.recv_message()
 
-        await self._backends[message.backend_name].restart(message.config.configuration)
+        try:
+            await self._backends[message.backend_name].restart(
+                message.config.configuration
+            )
+        finally:
+            self._index_tags()
         await stream.send_message(Empty())
 
     async def GetBackendStats(self, stream: Stream[Backend, BackendStats]):
@@ -186,5 +593,30 @@ class MarzService(MarzServiceBase):
                 Status.NOT_FOUND,
                 "Backend doesn't exist",
             )
-        running = self._backends[backend.name].running
-        await stream.send_message(BackendStats(running=running))
+        backend = self._backends[backend.name]
+        queue = backend.retry_queue
+        await stream.send_message(
+            BackendStats(
+                running=backend.running,
+                retry_queue_depth=len(queue) if queue is not None else 0,
+                retry_queue_age=queue.age if queue is not None else 0.0,
+            )
+        )
+
+    async def GetNodeStats(self, stream: Stream[Empty, NodeStats]) -> None:
+        await stream.recv_message()
+        storage_stats = await self._storage.stats()
+        await stream.send_message(
+            NodeStats(
+                users=storage_stats.users,
+                inbounds=len(storage_stats.inbound_users),
+                inbound_users=storage_stats.inbound_users,
+                storage_bytes=storage_stats.estimated_bytes,
+                storage_generation=self._storage.generation,
+                rss_bytes=rss_bytes(),
+                gc_collections=[stats["collections"] for stats in gc.get_stats()],
+                gc_counts=gc.get_count(),
+                synced_users=self.sync_counters.messages,
+                sync_seconds=self.sync_counters.seconds,
+            )
+        )
@@ -22,12 +22,32 @@ class MarzServiceBase(abc.ABC):
     async def RepopulateUsers(self, stream: 'grpclib.server.Stream[marznode.service.service_pb2.UsersData, marznode.service.service_pb2.Empty]') -> None:
         pass
 
+    @abc.abstractmethod
+    async def FetchUsersDigest(self, stream: 'grpclib.server.Stream[marznode.service.service_pb2.Empty, marznode.service.service_pb2.UsersDigest]') -> None:
+        pass
+
+    @abc.abstractmethod
+    async def RepopulateUsersDelta(self, stream: 'grpclib.server.Stream[marznode.service.service_pb2.UsersDelta, marznode.service.service_pb2.Empty]') -> None:
+        pass
+
     @abc.abstractmethod
     async def FetchBackends(self, stream: 'grpclib.server.Stream[marznode.service.service_pb2.Empty, marznode.service.service_pb2.BackendsResponse]') -> None:
         pass
 
     @abc.abstractmethod
-    async def FetchUsersStats(self, stream: 'grpclib.server.Stream[marznode.service.service_pb2.Empty, marznode.service.service_pb2.UsersStats]') -> None:
+    async def FetchUsersStats(self, stream: 'grpclib.server.Stream[marznode.service.service_pb2.UsersStatsRequest, marznode.service.service_pb2.UsersStats]') -> None:
+        pass
+
+    @abc.abstractmethod
+    async def FetchUsersStatsChunked(self, stream: 'grpclib.server.Stream[marznode.service.service_pb2.UsersStatsRequest, marznode.service.service_pb2.UsersStats]') -> None:
+        pass
+
+    @abc.abstractmethod
+    async def StreamUsersStats(self, stream: 'grpclib.server.Stream[marznode.service.service_pb2.UsersStatsSubscription, marznode.service.service_pb2.UsersStats]') -> None:
+        pass
+
+    @abc.abstractmethod
+    async def AcknowledgeUsersStats(self, stream: 'grpclib.server.Stream[marznode.service.service_pb2.UsersStatsAck, marznode.service.service_pb2.Empty]') -> None:
         pass
 
     @abc.abstractmethod
@@ -46,6 +66,10 @@ class MarzServiceBase(abc.ABC):
     async def GetBackendStats(self, stream: 'grpclib.server.Stream[marznode.service.service_pb2.Backend, marznode.service.service_pb2.BackendStats]') -> None:
         pass
 
+    @abc.abstractmethod
+    async def GetNodeStats(self, stream: 'grpclib.server.Stream[marznode.service.service_pb2.Empty, marznode.service.service_pb2.NodeStats]') -> None:
+        pass
+
     def __mapping__(self) -> typing.Dict[str, grpclib.const.Handler]:
         return {
             '/marznode.MarzService/SyncUsers': grpclib.const.Handler(
@@ -60,6 +84,18 @@ class MarzServiceBase(abc.ABC):
                 marznode.service.service_pb2.UsersData,
                 marznode.service.service_pb2.Empty,
             ),
+            '/marznode.MarzService/FetchUsersDigest': grpclib.const.Handler(
+                self.FetchUsersDigest,
+                grpclib.const.Cardinality.UNARY_UNARY,
+                marznode.service.service_pb2.Empty,
+                marznode.service.service_pb2.UsersDigest,
+            ),
+            '/marznode.MarzService/RepopulateUsersDelta': grpclib.const.Handler(
+                self.RepopulateUsersDelta,
+                grpclib.const.Cardinality.UNARY_UNARY,
+                marznode.service.service_pb2.UsersDelta,
+                marznode.service.service_pb2.Empty,
+            ),
             '/marznode.MarzService/FetchBackends': grpclib.const.Handler(
                 self.FetchBackends,
                 grpclib.const.Cardinality.UNARY_UNARY,
@@ -69,9 +105,27 @@ class MarzServiceBase(abc.ABC):
             '/marznode.MarzService/FetchUsersStats': grpclib.const.Handler(
                 self.FetchUsersStats,
                 grpclib.const.Cardinality.UNARY_UNARY,
-                marznode.service.service_pb2.Empty,
+                marznode.service.service_pb2.UsersStatsRequest,
+                marznode.service.service_pb2.UsersStats,
+            ),
+            '/marznode.MarzService/FetchUsersStatsChunked': grpclib.const.Handler(
+                self.FetchUsersStatsChunked,
+                grpclib.const.Cardinality.UNARY_STREAM,
+                marznode.service.service_pb2.UsersStatsRequest,
                 marznode.service.service_pb2.UsersStats,
             ),
+            '/marznode.MarzService/StreamUsersStats': grpclib.const.Handler(
+                self.StreamUsersStats,
+                grpclib.const.Cardinality.UNARY_STREAM,
+                marznode.service.service_pb2.UsersStatsSubscription,
+                marznode.service.service_pb2.UsersStats,
+            ),
+            '/marznode.MarzService/AcknowledgeUsersStats': grpclib.const.Handler(
+                self.AcknowledgeUsersStats,
+                grpclib.const.Cardinality.UNARY_UNARY,
+                marznode.service.service_pb2.UsersStatsAck,
+                marznode.service.service_pb2.Empty,
+            ),
             '/marznode.MarzService/FetchBackendConfig': grpclib.const.Handler(
                 self.FetchBackendConfig,
                 grpclib.const.Cardinality.UNARY_UNARY,
@@ -96,6 +150,12 @@ class MarzServiceBase(abc.ABC):
                 marznode.service.service_pb2.Backend,
                 marznode.service.service_pb2.BackendStats,
             ),
+            '/marznode.MarzService/GetNodeStats': grpclib.const.Handler(
+                self.GetNodeStats,
+                grpclib.const.Cardinality.UNARY_UNARY,
+                marznode.service.service_pb2.Empty,
+                marznode.service.service_pb2.NodeStats,
+            ),
         }
 
 
@@ -114,6 +174,18 @@ class MarzServiceStub:
             marznode.service.service_pb2.UsersData,
             marznode.service.service_pb2.Empty,
         )
+        self.FetchUsersDigest = grpclib.client.UnaryUnaryMethod(
+            channel,
+            '/marznode.MarzService/FetchUsersDigest',
+            marznode.service.service_pb2.Empty,
+            marznode.service.service_pb2.UsersDigest,
+        )
+        self.RepopulateUsersDelta = grpclib.client.UnaryUnaryMethod(
+            channel,
+            '/marznode.MarzService/RepopulateUsersDelta',
+            marznode.service.service_pb2.UsersDelta,
+            marznode.service.service_pb2.Empty,
+        )
         self.FetchBackends = grpclib.client.UnaryUnaryMethod(
             channel,
             '/marznode.MarzService/FetchBackends',
@@ -123,9 +195,27 @@ class MarzServiceStub:
         self.FetchUsersStats = grpclib.client.UnaryUnaryMethod(
             channel,
             '/marznode.MarzService/FetchUsersStats',
-            marznode.service.service_pb2.Empty,
+            marznode.service.service_pb2.UsersStatsRequest,
+            marznode.service.service_pb2.UsersStats,
+        )
+        self.FetchUsersStatsChunked = grpclib.client.UnaryStreamMethod(
+            channel,
+            '/marznode.MarzService/FetchUsersStatsChunked',
+            marznode.service.service_pb2.UsersStatsRequest,
+            marznode.service.service_pb2.UsersStats,
+        )
+        self.StreamUsersStats = grpclib.client.UnaryStreamMethod(
+            channel,
+            '/marznode.MarzService/StreamUsersStats',
+            marznode.service.service_pb2.UsersStatsSubscription,
             marznode.service.service_pb2.UsersStats,
         )
+        self.AcknowledgeUsersStats = grpclib.client.UnaryUnaryMethod(
+            channel,
+            '/marznode.MarzService/AcknowledgeUsersStats',
+            marznode.service.service_pb2.UsersStatsAck,
+            marznode.service.service_pb2.Empty,
+        )
         self.FetchBackendConfig = grpclib.client.UnaryUnaryMethod(
             channel,
             '/marznode.MarzService/FetchBackendConfig',
@@ -150,3 +240,9 @@ class MarzServiceStub:
             marznode.service.service_pb2.Backend,
             marznode.service.service_pb2.BackendStats,
         )
+        self.GetNodeStats = grpclib.client.UnaryUnaryMethod(
+            channel,
+            '/marznode.MarzService/GetNodeStats',
+            marznode.service.service_pb2.Empty,
+            marznode.service.service_pb2.NodeStats,
+        )
@@ -14,15 +14,17 @@ _sym_db = _symbol_database.Default()
 
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x1emarznode/service/service.proto\x12\x08marznode\"\x07\n\x05\x45mpty\"z\n\x07\x42\x61\x63kend\x12\x0c\n\x04name\x18\x01 \x01(\t\x12\x11\n\x04type\x18\x02 \x01(\tH\x00\x88\x01\x01\x12\x14\n\x07version\x18\x03 \x01(\tH\x01\x88\x01\x01\x12#\n\x08inbounds\x18\x04 \x03(\x0b\x32\x11.marznode.InboundB\x07\n\x05_typeB\n\n\x08_version\"7\n\x10\x42\x61\x63kendsResponse\x12#\n\x08\x62\x61\x63kends\x18\x01 \x03(\x0b\x32\x11.marznode.Backend\"6\n\x07Inbound\x12\x0b\n\x03tag\x18\x01 \x01(\t\x12\x13\n\x06\x63onfig\x18\x02 \x01(\tH\x00\x88\x01\x01\x42\t\n\x07_config\"1\n\x04User\x12\n\n\x02id\x18\x01 \x01(\r\x12\x10\n\x08username\x18\x02 \x01(\t\x12\x0b\n\x03key\x18\x03 \x01(\t\"M\n\x08UserData\x12\x1c\n\x04user\x18\x01 \x01(\x0b\x32\x0e.marznode.User\x12#\n\x08inbounds\x18\x02 \x03(\x0b\x32\x11.marznode.Inbound\"3\n\tUsersData\x12&\n\nusers_data\x18\x01 \x03(\x0b\x32\x12.marznode.UserData\"j\n\nUsersStats\x12\x33\n\x0busers_stats\x18\x01 \x03(\x0b\x32\x1e.marznode.UsersStats.UserStats\x1a\'\n\tUserStats\x12\x0b\n\x03uid\x18\x01 \x01(\r\x12\r\n\x05usage\x18\x02 \x01(\x04\"\x17\n\x07LogLine\x12\x0c\n\x04line\x18\x01 \x01(\t\"U\n\rBackendConfig\x12\x15\n\rconfiguration\x18\x01 \x01(\t\x12-\n\rconfig_format\x18\x02 \x01(\x0e\x32\x16.marznode.ConfigFormat\"B\n\x12\x42\x61\x63kendLogsRequest\x12\x14\n\x0c\x62\x61\x63kend_name\x18\x01 \x01(\t\x12\x16\n\x0einclude_buffer\x18\x02 \x01(\x08\"f\n\x15RestartBackendRequest\x12\x14\n\x0c\x62\x61\x63kend_name\x18\x01 \x01(\t\x12,\n\x06\x63onfig\x18\x02 \x01(\x0b\x32\x17.marznode.BackendConfigH\x00\x88\x01\x01\x42\t\n\x07_config\"\x1f\n\x0c\x42\x61\x63kendStats\x12\x0f\n\x07running\x18\x01 \x01(\x08*-\n\x0c\x43onfigFormat\x12\t\n\x05PLAIN\x10\x00\x12\x08\n\x04JSON\x10\x01\x12\x08\n\x04YAML\x10\x02\x32\xfe\x03\n\x0bMarzService\x12\x32\n\tSyncUsers\x12\x12.marznode.UserData\x1a\x0f.marznode.Empty(\x01\x12\x37\n\x0fRepopulateUsers\x12\x13.marznode.UsersData\x1a\x0f.marznode.Empty\x12<\n\rFetchBackends\x12\x0f.marznode.Empty\x1a\x1a.marznode.BackendsResponse\x12\x38\n\x0f\x46\x65tchUsersStats\x12\x0f.marznode.Empty\x1a\x14.marznode.UsersStats\x12@\n\x12\x46\x65tchBackendConfig\x12\x11.marznode.Backend\x1a\x17.marznode.BackendConfig\x12\x42\n\x0eRestartBackend\x12\x1f.marznode.RestartBackendRequest\x1a\x0f.marznode.Empty\x12\x46\n\x11StreamBackendLogs\x12\x1c.marznode.BackendLogsRequest\x1a\x11.marznode.LogLine0\x01\x12<\n\x0fGetBackendStats\x12\x11.marznode.Backend\x1a\x16.marznode.BackendStatsb\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x1emarznode/service/service.proto\x12\x08marznode\"\x07\n\x05\x45mpty\"z\n\x07\x42\x61\x63kend\x12\x0c\n\x04name\x18\x01 \x01(\t\x12\x11\n\x04type\x18\x02 \x01(\tH\x00\x88\x01\x01\x12\x14\n\x07version\x18\x03 \x01(\tH\x01\x88\x01\x01\x12#\n\x08inbounds\x18\x04 \x03(\x0b\x32\x11.marznode.InboundB\x07\n\x05_typeB\n\n\x08_version\"7\n\x10\x42\x61\x63kendsResponse\x12#\n\x08\x62\x61\x63kends\x18\x01 \x03(\x0b\x32\x11.marznode.Backend\"6\n\x07Inbound\x12\x0b\n\x03tag\x18\x01 \x01(\t\x12\x13\n\x06\x63onfig\x18\x02 \x01(\tH\x00\x88\x01\x01\x42\t\n\x07_config\"1\n\x04User\x12\n\n\x02id\x18\x01 \x01(\r\x12\x10\n\x08username\x18\x02 \x01(\t\x12\x0b\n\x03key\x18\x03 \x01(\t\"M\n\x08UserData\x12\x1c\n\x04user\x18\x01 \x01(\x0b\x32\x0e.marznode.User\x12#\n\x08inbounds\x18\x02 \x03(\x0b\x32\x11.marznode.Inbound\"~\n\x0fPackedUsersData\x12\x0c\n\x04tags\x18\x01 \x03(\t\x12\x0b\n\x03ids\x18\x02 \x03(\r\x12\x11\n\tusernames\x18\x03 \x03(\t\x12\x0c\n\x04keys\x18\x04 \x03(\t\x12\x16\n\x0einbound_counts\x18\x05 \x03(\r\x12\x17\n\x0finbound_indices\x18\x06 \x03(\r\"^\n\tUsersData\x12&\n\nusers_data\x18\x01 \x03(\x0b\x32\x12.marznode.UserData\x12)\n\x06packed\x18\x02 \x01(\x0b\x32\x19.marznode.PackedUsersData\"4\n\x0bUsersDigest\x12\x14\n\x0c\x62ucket_count\x18\x01 \x01(\r\x12\x0f\n\x07\x62uckets\x18\x02 \x03(\x04\"p\n\nUsersDelta\x12\x0f\n\x07\x62uckets\x18\x01 \x03(\r\x12&\n\nusers_data\x18\x02 \x03(\x0b\x32\x12.marznode.UserData\x12)\n\x06packed\x18\x03 \x01(\x0b\x32\x19.marznode.PackedUsersData\"0\n\x10PackedUsersStats\x12\x0c\n\x04uids\x18\x01 \x03(\r\x12\x0e\n\x06usages\x18\x02 \x03(\x04\"\xc5\x01\n\nUsersStats\x12\x33\n\x0busers_stats\x18\x01 \x03(\x0b\x32\x1e.marznode.UsersStats.UserStats\x12\x1b\n\x13incomplete_backends\x18\x02 \x03(\t\x12*\n\x06packed\x18\x03 \x01(\x0b\x32\x1a.marznode.PackedUsersStats\x12\x10\n\x08sequence\x18\x04 \x01(\x04\x1a\'\n\tUserStats\x12\x0b\n\x03uid\x18\x01 \x01(\r\x12\r\n\x05usage\x18\x02 \x01(\x04\"u\n\x11UsersStatsRequest\x12\x17\n\nchunk_size\x18\x01 \x01(\rH\x00\x88\x01\x01\x12\x0e\n\x06packed\x18\x02 \x01(\x08\x12\x18\n\x0b\x61\x63knowledge\x18\x03 \x01(\x04H\x01\x88\x01\x01\x42\r\n\x0b_chunk_sizeB\x0e\n\x0c_acknowledge\"P\n\x16UsersStatsSubscription\x12\x10\n\x08interval\x18\x01 \x01(\r\x12\x0e\n\x06packed\x18\x02 \x01(\x08\x12\x14\n\x0c\x61\x63knowledged\x18\x03 \x01(\x08\"!\n\rUsersStatsAck\x12\x10\n\x08sequence\x18\x01 \x01(\x04\"\x17\n\x07LogLine\x12\x0c\n\x04line\x18\x01 \x01(\t\"U\n\rBackendConfig\x12\x15\n\rconfiguration\x18\x01 \x01(\t\x12-\n\rconfig_format\x18\x02 \x01(\x0e\x32\x16.marznode.ConfigFormat\"B\n\x12\x42\x61\x63kendLogsRequest\x12\x14\n\x0c\x62\x61\x63kend_name\x18\x01 \x01(\t\x12\x16\n\x0einclude_buffer\x18\x02 \x01(\x08\"f\n\x15RestartBackendRequest\x12\x14\n\x0c\x62\x61\x63kend_name\x18\x01 \x01(\t\x12,\n\x06\x63onfig\x18\x02 \x01(\x0b\x32\x17.marznode.BackendConfigH\x00\x88\x01\x01\x42\t\n\x07_config\"S\n\x0c\x42\x61\x63kendStats\x12\x0f\n\x07running\x18\x01 \x01(\x08\x12\x19\n\x11retry_queue_depth\x18\x02 \x01(\r\x12\x17\n\x0fretry_queue_age\x18\x03 \x01(\x01\"\xbc\x02\n\tNodeStats\x12\r\n\x05users\x18\x01 \x01(\x04\x12\x10\n\x08inbounds\x18\x02 \x01(\r\x12<\n\rinbound_users\x18\x03 \x03(\x0b\x32%.marznode.NodeStats.InboundUsersEntry\x12\x15\n\rstorage_bytes\x18\x04 \x01(\x04\x12\x1a\n\x12storage_generation\x18\x05 \x01(\x04\x12\x11\n\trss_bytes\x18\x06 \x01(\x04\x12\x16\n\x0egc_collections\x18\x07 \x03(\x04\x12\x11\n\tgc_counts\x18\x08 \x03(\x04\x12\x14\n\x0csynced_users\x18\t \x01(\x04\x12\x14\n\x0csync_seconds\x18\n \x01(\x01\x1a\x33\n\x11InboundUsersEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\x04:\x02\x38\x01*-\n\x0c\x43onfigFormat\x12\t\n\x05PLAIN\x10\x00\x12\x08\n\x04JSON\x10\x01\x12\x08\n\x04YAML\x10\x02\x32\x9b\x07\n\x0bMarzService\x12\x32\n\tSyncUsers\x12\x12.marznode.UserData\x1a\x0f.marznode.Empty(\x01\x12\x37\n\x0fRepopulateUsers\x12\x13.marznode.UsersData\x1a\x0f.marznode.Empty\x12:\n\x10\x46\x65tchUsersDigest\x12\x0f.marznode.Empty\x1a\x15.marznode.UsersDigest\x12=\n\x14RepopulateUsersDelta\x12\x14.marznode.UsersDelta\x1a\x0f.marznode.Empty\x12<\n\rFetchBackends\x12\x0f.marznode.Empty\x1a\x1a.marznode.BackendsResponse\x12\x44\n\x0f\x46\x65tchUsersStats\x12\x1b.marznode.UsersStatsRequest\x1a\x14.marznode.UsersStats\x12M\n\x16\x46\x65tchUsersStatsChunked\x12\x1b.marznode.UsersStatsRequest\x1a\x14.marznode.UsersStats0\x01\x12L\n\x10StreamUsersStats\x12 .marznode.UsersStatsSubscription\x1a\x14.marznode.UsersStats0\x01\x12\x41\n\x15\x41\x63knowledgeUsersStats\x12\x17.marznode.UsersStatsAck\x1a\x0f.marznode.Empty\x12@\n\x12\x46\x65tchBackendConfig\x12\x11.marznode.Backend\x1a\x17.marznode.BackendConfig\x12\x42\n\x0eRestartBackend\x12\x1f.marznode.RestartBackendRequest\x1a\x0f.marznode.Empty\x12\x46\n\x11StreamBackendLogs\x12\x1c.marznode.BackendLogsRequest\x1a\x11.marznode.LogLine0\x01\x12<\n\x0fGetBackendStats\x12\x11.marznode.Backend\x1a\x16.marznode.BackendStats\x12\x34\n\x0cGetNodeStats\x12\x0f.marznode.Empty\x1a\x13.marznode.NodeStatsb\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
 _builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'marznode.service.service_pb2', _globals)
 if not _descriptor._USE_C_DESCRIPTORS:
   DESCRIPTOR._loaded_options = None
-  _globals['_CONFIGFORMAT']._serialized_start=898
-  _globals['_CONFIGFORMAT']._serialized_end=943
+  _globals['_NODESTATS_INBOUNDUSERSENTRY']._loaded_options = None
+  _globals['_NODESTATS_INBOUNDUSERSENTRY']._serialized_options = b'8\001'
+  _globals['_CONFIGFORMAT']._serialized_start=1986
+  _globals['_CONFIGFORMAT']._serialized_end=2031
   _globals['_EMPTY']._serialized_start=44
   _globals['_EMPTY']._serialized_end=51
   _globals['_BACKEND']._serialized_start=53
@@ -35,22 +37,40 @@ if not _descriptor._USE_C_DESCRIPTORS:
   _globals['_USER']._serialized_end=339
   _globals['_USERDATA']._serialized_start=341
   _globals['_USERDATA']._serialized_end=418
-  _globals['_USERSDATA']._serialized_start=420
-  _globals['_USERSDATA']._serialized_end=471
-  _globals['_USERSSTATS']._serialized_start=473
-  _globals['_USERSSTATS']._serialized_end=579
-  _globals['_USERSSTATS_USERSTATS']._serialized_start=540
-  _globals['_USERSSTATS_USERSTATS']._serialized_end=579
-  _globals['_LOGLINE']._serialized_start=581
-  _globals['_LOGLINE']._serialized_end=604
-  _globals['_BACKENDCONFIG']._serialized_start=606
-  _globals['_BACKENDCONFIG']._serialized_end=691
-  _globals['_BACKENDLOGSREQUEST']._serialized_start=693
-  _globals['_BACKENDLOGSREQUEST']._serialized_end=759
-  _globals['_RESTARTBACKENDREQUEST']._serialized_start=761
-  _globals['_RESTARTBACKENDREQUEST']._serialized_end=863
-  _globals['_BACKENDSTATS']._serialized_start=865
-  _globals['_BACKENDSTATS']._serialized_end=896
-  _globals['_MARZSERVICE']._serialized_start=946
-  _globals['_MARZSERVICE']._serialized_end=1456
+  _globals['_PACKEDUSERSDATA']._serialized_start=420
+  _globals['_PACKEDUSERSDATA']._serialized_end=546
+  _globals['_USERSDATA']._serialized_start=548
+  _globals['_USERSDATA']._serialized_end=642
+  _globals['_USERSDIGEST']._serialized_start=644
+  _globals['_USERSDIGEST']._serialized_end=696
+  _globals['_USERSDELTA']._serialized_start=698
+  _globals['_USERSDELTA']._serialized_end=810
+  _globals['_PACKEDUSERSSTATS']._serialized_start=812
+  _globals['_PACKEDUSERSSTATS']._serialized_end=860
+  _globals['_USERSSTATS']._serialized_start=863
+  _globals['_USERSSTATS']._serialized_end=1060
+  _globals['_USERSSTATS_USERSTATS']._serialized_start=1021
+  _globals['_USERSSTATS_USERSTATS']._serialized_end=1060
+  _globals['_USERSSTATSREQUEST']._serialized_start=1062
+  _globals['_USERSSTATSREQUEST']._serialized_end=1179
+  _globals['_USERSSTATSSUBSCRIPTION']._serialized_start=1181
+  _globals['_USERSSTATSSUBSCRIPTION']._serialized_end=1261
+  _globals['_USERSSTATSACK']._serialized_start=1263
+  _globals['_USERSSTATSACK']._serialized_end=1296
+  _globals['_LOGLINE']._serialized_start=1298
+  _globals['_LOGLINE']._serialized_end=1321
+  _globals['_BACKENDCONFIG']._serialized_start=1323
+  _globals['_BACKENDCONFIG']._serialized_end=1408
+  _globals['_BACKENDLOGSREQUEST']._serialized_start=1410
+  _globals['_BACKENDLOGSREQUEST']._serialized_end=1476
+  _globals['_RESTARTBACKENDREQUEST']._serialized_start=1478
+  _globals['_RESTARTBACKENDREQUEST']._serialized_end=1580
+  _globals['_BACKENDSTATS']._serialized_start=1582
+  _globals['_BACKENDSTATS']._serialized_end=1665
+  _globals['_NODESTATS']._serialized_start=1668
+  _globals['_NODESTATS']._serialized_end=1984
+  _globals['_NODESTATS_INBOUNDUSERSENTRY']._serialized_start=1933
+  _globals['_NODESTATS_INBOUNDUSERSENTRY']._serialized_end=1984
+  _globals['_MARZSERVICE']._serialized_start=2034
+  _globals['_MARZSERVICE']._serialized_end=2957
 # @@protoc_insertion_point(module_scope)
@@ -63,14 +63,58 @@ class UserData(_message.Message):
     inbounds: _containers.RepeatedCompositeFieldContainer[Inbound]
     def __init__(self, user: _Optional[_Union[User, _Mapping]] = ..., inbounds: _Optional[_Iterable[_Union[Inbound, _Mapping]]] = ...) -> None: ...
 
+class PackedUsersData(_message.Message):
+    __slots__ = ("tags", "ids", "usernames", "keys", "inbound_counts", "inbound_indices")
+    TAGS_FIELD_NUMBER: _ClassVar[int]
+    IDS_FIELD_NUMBER: _ClassVar[int]
+    USERNAMES_FIELD_NUMBER: _ClassVar[int]
+    KEYS_FIELD_NUMBER: _ClassVar[int]
+    INBOUND_COUNTS_FIELD_NUMBER: _ClassVar[int]
+    INBOUND_INDICES_FIELD_NUMBER: _ClassVar[int]
+    tags: _containers.RepeatedScalarFieldContainer[str]
+    ids: _containers.RepeatedScalarFieldContainer[int]
+    usernames: _containers.RepeatedScalarFieldContainer[str]
+    keys: _containers.RepeatedScalarFieldContainer[str]
+    inbound_counts: _containers.RepeatedScalarFieldContainer[int]
+    inbound_indices: _containers.RepeatedScalarFieldContainer[int]
+    def __init__(self, tags: _Optional[_Iterable[str]] = ..., ids: _Optional[_Iterable[int]] = ..., usernames: _Optional[_Iterable[str]] = ..., keys: _Optional[_Iterable[str]] = ..., inbound_counts: _Optional[_Iterable[int]] = ..., inbound_indices: _Optional[_Iterable[int]] = ...) -> None: ...
+
 class UsersData(_message.Message):
-    __slots__ = ("users_data",)
+    __slots__ = ("users_data", "packed")
+    USERS_DATA_FIELD_NUMBER: _ClassVar[int]
+    PACKED_FIELD_NUMBER: _ClassVar[int]
+    users_data: _containers.RepeatedCompositeFieldContainer[UserData]
+    packed: PackedUsersData
+    def __init__(self, users_data: _Optional[_Iterable[_Union[UserData, _Mapping]]] = ..., packed: _Optional[_Union[PackedUsersData, _Mapping]] = ...) -> None: ...
+
+class UsersDigest(_message.Message):
+    __slots__ = ("bucket_count", "buckets")
+    BUCKET_COUNT_FIELD_NUMBER: _ClassVar[int]
+    BUCKETS_FIELD_NUMBER: _ClassVar[int]
+    bucket_count: int
+    buckets: _containers.RepeatedScalarFieldContainer[int]
+    def __init__(self, bucket_count: _Optional[int] = ..., buckets: _Optional[_Iterable[int]] = ...) -> None: ...
+
+class UsersDelta(_message.Message):
+    __slots__ = ("buckets", "users_data", "packed")
+    BUCKETS_FIELD_NUMBER: _ClassVar[int]
     USERS_DATA_FIELD_NUMBER: _ClassVar[int]
+    PACKED_FIELD_NUMBER: _ClassVar[int]
+    buckets: _containers.RepeatedScalarFieldContainer[int]
     users_data: _containers.RepeatedCompositeFieldContainer[UserData]
-    def __init__(self, users_data: _Optional[_Iterable[_Union[UserData, _Mapping]]] = ...) -> None: ...
+    packed: PackedUsersData
+    def __init__(self, buckets: _Optional[_Iterable[int]] = ..., users_data: _Optional[_Iterable[_Union[UserData, _Mapping]]] = ..., packed: _Optional[_Union[PackedUsersData, _Mapping]] = ...) -> None: ...
+
+class PackedUsersStats(_message.Message):
+    __slots__ = ("uids", "usages")
+    UIDS_FIELD_NUMBER: _ClassVar[int]
+    USAGES_FIELD_NUMBER: _ClassVar[int]
+    uids: _containers.RepeatedScalarFieldContainer[int]
+    usages: _containers.RepeatedScalarFieldContainer[int]
+    def __init__(self, uids: _Optional[_Iterable[int]] = ..., usages: _Optional[_Iterable[int]] = ...) -> None: ...
 
 class UsersStats(_message.Message):
-    __slots__ = ("users_stats",)
+    __slots__ = ("users_stats", "incomplete_backends", "packed", "sequence")
     class UserStats(_message.Message):
         __slots__ = ("uid", "usage")
         UID_FIELD_NUMBER: _ClassVar[int]
@@ -79,8 +123,40 @@ class UsersStats(_message.Message):
         usage: int
         def __init__(self, uid: _Optional[int] = ..., usage: _Optional[int] = ...) -> None: ...
     USERS_STATS_FIELD_NUMBER: _ClassVar[int]
+    INCOMPLETE_BACKENDS_FIELD_NUMBER: _ClassVar[int]
+    PACKED_FIELD_NUMBER: _ClassVar[int]
+    SEQUENCE_FIELD_NUMBER: _ClassVar[int]
     users_stats: _containers.RepeatedCompositeFieldContainer[UsersStats.UserStats]
-    def __init__(self, users_stats: _Optional[_Iterable[_Union[UsersStats.UserStats, _Mapping]]] = ...) -> None: ...
+    incomplete_backends: _containers.RepeatedScalarFieldContainer[str]
+    packed: PackedUsersStats
+    sequence: int
+    def __init__(self, users_stats: _Optional[_Iterable[_Union[UsersStats.UserStats, _Mapping]]] = ..., incomplete_backends: _Optional[_Iterable[str]] = ..., packed: _Optional[_Union[PackedUsersStats, _Mapping]] = ..., sequence: _Optional[int] = ...) -> None: ...
+
+class UsersStatsRequest(_message.Message):
+    __slots__ = ("chunk_size", "packed", "acknowledge")
+    CHUNK_SIZE_FIELD_NUMBER: _ClassVar[int]
+    PACKED_FIELD_NUMBER: _ClassVar[int]
+    ACKNOWLEDGE_FIELD_NUMBER: _ClassVar[int]
+    chunk_size: int
+    packed: bool
+    acknowledge: int
+    def __init__(self, chunk_size: _Optional[int] = ..., packed: bool = ..., acknowledge: _Optional[int] = ...) -> None: ...
+
+class UsersStatsSubscription(_message.Message):
+    __slots__ = ("interval", "packed", "acknowledged")
+    INTERVAL_FIELD_NUMBER: _ClassVar[int]
+    PACKED_FIELD_NUMBER: _ClassVar[int]
+    ACKNOWLEDGED_FIELD_NUMBER: _ClassVar[int]
+    interval: int
+    packed: bool
+    acknowledged: bool
+    def __init__(self, interval: _Optional[int] = ..., packed: bool = ..., acknowledged: bool = ...) -> None: ...
+
+class UsersStatsAck(_message.Message):
+    __slots__ = ("sequence",)
+    SEQUENCE_FIELD_NUMBER: _ClassVar[int]
+    sequence: int
+    def __init__(self, sequence: _Optional[int] = ...) -> None: ...
 
 class LogLine(_message.Message):
     __slots__ = ("line",)
@@ -113,7 +189,42 @@ class RestartBackendRequest(_message.Message):
     def __init__(self, backend_name: _Optional[str] = ..., config: _Optional[_Union[BackendConfig, _Mapping]] = ...) -> None: ...
 
 class BackendStats(_message.Message):
-    __slots__ = ("running",)
+    __slots__ = ("running", "retry_queue_depth", "retry_queue_age")
     RUNNING_FIELD_NUMBER: _ClassVar[int]
+    RETRY_QUEUE_DEPTH_FIELD_NUMBER: _ClassVar[int]
+    RETRY_QUEUE_AGE_FIELD_NUMBER: _ClassVar[int]
     running: bool
-    def __init__(self, running: bool = ...) -> None: ...
+    retry_queue_depth: int
+    retry_queue_age: float
+    def __init__(self, running: bool = ..., retry_queue_depth: _Optional[int] = ..., retry_queue_age: _Optional[float] = ...) -> None: ...
+
+class NodeStats(_message.Message):
+    __slots__ = ("users", "inbounds", "inbound_users", "storage_bytes", "storage_generation", "rss_bytes", "gc_collections", "gc_counts", "synced_users", "sync_seconds")
+    class InboundUsersEntry(_message.Message):
+        __slots__ = ("key", "value")
+        KEY_FIELD_NUMBER: _ClassVar[int]
+        VALUE_FIELD_NUMBER: _ClassVar[int]
+        key: str
+        value: int
+        def __init__(self, key: _Optional[str] = ..., value: _Optional[int] = ...) -> None: ...
+    USERS_FIELD_NUMBER: _ClassVar[int]
+    INBOUNDS_FIELD_NUMBER: _ClassVar[int]
+    INBOUND_USERS_FIELD_NUMBER: _ClassVar[int]
+    STORAGE_BYTES_FIELD_NUMBER: _ClassVar[int]
+    STORAGE_GENERATION_FIELD_NUMBER: _ClassVar[int]
+    RSS_BYTES_FIELD_NUMBER: _ClassVar[int]
+    GC_COLLECTIONS_FIELD_NUMBER: _ClassVar[int]
+    GC_COUNTS_FIELD_NUMBER: _ClassVar[int]
+    SYNCED_USERS_FIELD_NUMBER: _ClassVar[int]
+    SYNC_SECONDS_FIELD_NUMBER: _ClassVar[int]
+    users: int
+    inbounds: int
+    inbound_users: _containers.ScalarMap[str, int]
+    storage_bytes: int
+    storage_generation: int
+    rss_bytes: int
+    gc_collections: _containers.RepeatedScalarFieldContainer[int]
+    gc_counts: _containers.RepeatedScalarFieldContainer[int]
+    synced_users: int
+    sync_seconds: float
+    def __init__(self, users: _Optional[int] = ..., inbounds: _Optional[int] = ..., inbound_users: _Optional[_Mapping[str, int]] = ..., storage_bytes: _Optional[int] = ..., storage_generation: _Optional[int] = ..., rss_bytes: _Optional[int] = ..., gc_collections: _Optional[_Iterable[int]] = ..., gc_counts: _Optional[_Iterable[int]] = ..., synced_users: _Optional[int] = ..., sync_seconds: _Optional[float] = ...) -> None: ...
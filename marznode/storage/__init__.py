@@ -1,6 +1,21 @@
 """A module to store marznode data"""
 
-from .base import BaseStorage
+from .base import BaseStorage, MembershipChanges, StorageStats
+from .columnar import ColumnarStorage
+from .journal import Change, ChangeKind
 from .memory import MemoryStorage
+from .snapshot import Snapshot, StorageSnapshotter
+from .sqlite import SQLiteStorage
 
-__all__ = ["BaseStorage", "MemoryStorage"]
+__all__ = [
+    "BaseStorage",
+    "Change",
+    "ChangeKind",
+    "ColumnarStorage",
+    "MembershipChanges",
+    "MemoryStorage",
+    "Snapshot",
+    "SQLiteStorage",
+    "StorageSnapshotter",
+    "StorageStats",
+]
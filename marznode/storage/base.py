@@ -1,12 +1,90 @@
 """The base for marznode storage"""
 
 from abc import ABC, abstractmethod
+from collections import defaultdict
+from collections.abc import Iterable
+from dataclasses import dataclass, field
 
+from marznode.config import STORAGE_JOURNAL_SIZE
 from marznode.models import Inbound, User
+from .journal import Change, Journal
+from .snapshot import Snapshot
+
+
+@dataclass
+class MembershipChanges:
+    """the users added to and removed from each inbound by a bulk mutation"""
+
+    added: dict[str, set[int]] = field(default_factory=lambda: defaultdict(set))
+    removed: dict[str, set[int]] = field(default_factory=lambda: defaultdict(set))
+    previous: dict[int, User] = field(default_factory=dict)
+    """users removed from an inbound as they were stored, backends know them
+    by the stored username and key rather than the ones they're given"""
+
+    def record(
+        self,
+        previous: User | None,
+        old_tags: Iterable[str],
+        user: User | None,
+        new_tags: Iterable[str],
+    ) -> None:
+        """
+        records a user's change
+        :param previous: the user as it was stored, None if it wasn't
+        :param old_tags: tags of the inbounds the user had
+        :param user: the user as it's stored now, None if it was removed
+        :param new_tags: tags of the inbounds the user has now
+        """
+        old_tags, new_tags = set(old_tags), set(new_tags)
+        if (
+            previous is not None
+            and user is not None
+            and (previous.username, previous.key) != (user.username, user.key)
+        ):
+            """the user is replaced in all of its inbounds by one with the
+            new credentials, rather than only in the ones that changed"""
+            removed, added = old_tags, new_tags
+        else:
+            removed, added = old_tags - new_tags, new_tags - old_tags
+        user_id = previous.id if previous is not None else user.id
+        for tag in added:
+            self.added[tag].add(user_id)
+        for tag in removed:
+            self.removed[tag].add(user_id)
+        if removed:
+            self.previous[user_id] = previous
+
+
+@dataclass
+class StorageStats:
+    users: int
+    inbound_users: dict[str, int]
+    """number of users of each registered inbound"""
+    estimated_bytes: int
+    """memory taken by the users, or the size of the database on disk"""
 
 
 class BaseStorage(ABC):
-    """Base class for marznode storage"""
+    """Base class for marznode storage
+    implementations record every change they make in self._journal
+    """
+
+    def __init__(self):
+        self._journal = Journal(STORAGE_JOURNAL_SIZE)
+
+    @property
+    def generation(self) -> int:
+        """increases by one with every change to the storage"""
+        return self._journal.generation
+
+    def changes_since(self, generation: int) -> list[Change] | None:
+        """
+        lists the changes made to the storage after a generation
+        :param generation: the generation the caller is up to date with
+        :return: the changes, or None if they're too old to be remembered
+        in which case the caller should go through the whole storage
+        """
+        return self._journal.since(generation)
 
     @abstractmethod
     async def list_users(self, user_id: int | None = None) -> list[User] | User:
@@ -16,6 +94,13 @@ class BaseStorage(ABC):
         :return: a list of users or the user specified
         """
 
+    async def list_user_ids(self) -> Iterable[int]:
+        """
+        lists ids of the users in the storage
+        :return: an iterable of user ids
+        """
+        return [user.id for user in await self.list_users()]
+
     @abstractmethod
     async def list_inbounds(
         self, tag: list[str] | str | None = None, include_users: bool = False
@@ -36,6 +121,43 @@ class BaseStorage(ABC):
         :return: nothing
         """
 
+    async def bulk_upsert_users(
+        self, updates: Iterable[tuple[User, list[Inbound]]]
+    ) -> MembershipChanges:
+        """
+        sets the inbounds of a batch of users, users given no inbounds are removed
+        :param updates: users along with the inbounds they should have,
+        a user given more than once only gets its last update
+        :return: the users added to and removed from each inbound, a user
+        whose username or key changed is removed from all its previous inbounds
+        """
+        changes = MembershipChanges()
+        latest = {user.id: (user, inbounds) for user, inbounds in updates}
+        for user, inbounds in latest.values():
+            stored_user = await self.list_users(user.id)
+            old_tags = [i.tag for i in stored_user.inbounds] if stored_user else []
+            if inbounds:
+                changes.record(stored_user, old_tags, user, [i.tag for i in inbounds])
+                await self.update_user_inbounds(user, inbounds)
+            elif stored_user:
+                changes.record(stored_user, old_tags, None, [])
+                await self.remove_user(stored_user)
+        return changes
+
+    async def bulk_remove_users(self, user_ids: Iterable[int]) -> MembershipChanges:
+        """
+        removes a batch of users, ids which aren't stored are skipped
+        :param user_ids: ids of the users
+        :return: the users removed from each inbound
+        """
+        changes = MembershipChanges()
+        for user_id in user_ids:
+            if stored_user := await self.list_users(user_id):
+                old_tags = [i.tag for i in stored_user.inbounds]
+                changes.record(stored_user, old_tags, None, [])
+                await self.remove_user(stored_user)
+        return changes
+
     @abstractmethod
     async def remove_user(self, user: User) -> None:
         """
@@ -69,3 +191,31 @@ class BaseStorage(ABC):
         :param inbound: the inbound to remove
         :return: nothing
         """
+
+    async def stats(self) -> StorageStats:
+        """
+        counts users and inbound memberships by going through the storage,
+        storages should rather report them from counters they keep
+        :return: the stats
+        """
+        inbound_users = {
+            inbound.tag: len(await self.list_inbound_users(inbound.tag))
+            for inbound in await self.list_inbounds()
+        }
+        return StorageStats(len(await self.list_users()), inbound_users, 0)
+
+    def snapshot(self) -> Snapshot:
+        """
+        copies the users and their inbound memberships
+        :return: the snapshot
+        """
+        raise NotImplementedError
+
+    def restore(self, snapshot: Snapshot) -> None:
+        """
+        replaces the users with the ones in a snapshot,
+        memberships of inbounds which aren't registered yet are kept
+        :param snapshot: the snapshot
+        :return: nothing
+        """
+        raise NotImplementedError
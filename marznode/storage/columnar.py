@@ -0,0 +1,418 @@
+"""Storage backend for storing marznode data in memory, packed into arrays"""
+
+from array import array
+from bisect import bisect_left
+from collections.abc import Iterable
+from itertools import groupby
+from operator import itemgetter
+
+from .base import BaseStorage, MembershipChanges, StorageStats
+from .journal import ChangeKind
+from .snapshot import Snapshot
+from ..models import User, Inbound
+
+
+def _contains(ids: array, user_id: int) -> bool:
+    position = bisect_left(ids, user_id)
+    return position < len(ids) and ids[position] == user_id
+
+
+def _discard(ids: array, user_id: int) -> bool:
+    """:return: whether the id was there to be discarded"""
+    position = bisect_left(ids, user_id)
+    if position < len(ids) and ids[position] == user_id:
+        del ids[position]
+        return True
+    return False
+
+
+def _splice(
+    column: array, dropped: list[int], inserted: list[tuple[int, int]]
+) -> array:
+    """
+    rebuilds a column in one pass, copying the runs of rows between changes
+    :param dropped: sorted rows to leave out
+    :param inserted: (row, value) pairs sorted by row, each value going
+    before the row, values for the same row keep their order
+    :return: the new column
+    """
+    spliced = array(column.typecode)
+    start = 0
+    drops = iter(dropped)
+    drop = next(drops, None)
+    for row, values in groupby(inserted, key=itemgetter(0)):
+        while drop is not None and drop < row:
+            spliced += column[start:drop]
+            start = drop + 1
+            drop = next(drops, None)
+        spliced += column[start:row]
+        spliced.extend(value for _, value in values)
+        start = row
+    while drop is not None:
+        spliced += column[start:drop]
+        start = drop + 1
+        drop = next(drops, None)
+    spliced += column[start:]
+    return spliced
+
+
+class ColumnarStorage(BaseStorage):
+    """
+    A storage backend for marznode which keeps users in columns
+    instead of an object per user, so nodes with millions of users fit in memory.
+    users are sorted by id, their usernames and keys are kept in one buffer
+    and each inbound keeps the sorted ids of its users.
+    User objects are only built when they're listed.
+    like MemoryStorage, data gets wiped on restarts
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._inbounds: dict[str, Inbound] = {}
+        self._inbound_sets: dict[tuple[str, ...], tuple[Inbound, ...]] = {}
+        """users with the same inbounds share a single tuple of them"""
+        self._reset_users()
+
+    def _reset_users(self) -> None:
+        self._ids = array("I")
+        self._offsets = array("Q")
+        """where the username of each user, followed by its key, starts in _strings"""
+        self._username_lengths = array("H")
+        self._key_lengths = array("H")
+        self._strings = bytearray()
+        self._garbage = 0
+        """bytes of _strings which no user refers to anymore"""
+        self._members: dict[str, array] = {}
+        """maps inbound tags to the sorted ids of their users"""
+
+    def _row(self, user_id: int) -> int | None:
+        row = bisect_left(self._ids, user_id)
+        if row < len(self._ids) and self._ids[row] == user_id:
+            return row
+        return None
+
+    def _shared_inbounds(self, tags: tuple[str, ...]) -> tuple[Inbound, ...]:
+        if (shared := self._inbound_sets.get(tags)) is None:
+            shared = self._inbound_sets[tags] = tuple(
+                self._inbounds[tag] for tag in tags if tag in self._inbounds
+            )
+        return shared
+
+    def _build_user(self, row: int, tags: tuple[str, ...]) -> User:
+        start = self._offsets[row]
+        middle = start + self._username_lengths[row]
+        end = middle + self._key_lengths[row]
+        return User(
+            id=self._ids[row],
+            username=self._strings[start:middle].decode(),
+            key=self._strings[middle:end].decode(),
+            inbounds=self._shared_inbounds(tags),
+        )
+
+    def _build_users(self, user_ids: Iterable[int]) -> list[User]:
+        """builds the users of a sorted iterable of stored user ids,
+        walking the inbound members alongside instead of searching them"""
+        members = list(self._members.items())
+        cursors = [0] * len(members)
+        users = []
+        row = 0
+        for user_id in user_ids:
+            row = bisect_left(self._ids, user_id, row)
+            tags = []
+            for i, (tag, ids) in enumerate(members):
+                cursor = bisect_left(ids, user_id, cursors[i])
+                if cursor < len(ids) and ids[cursor] == user_id:
+                    tags.append(tag)
+                cursors[i] = cursor
+            users.append(self._build_user(row, tuple(tags)))
+        return users
+
+    async def list_users(self, user_id: int | None = None) -> list[User] | User | None:
+        if user_id is not None:
+            if (row := self._row(user_id)) is None:
+                return None
+            tags = tuple(
+                tag for tag, ids in self._members.items() if _contains(ids, user_id)
+            )
+            return self._build_user(row, tags)
+        return self._build_users(self._ids)
+
+    async def list_user_ids(self) -> Iterable[int]:
+        return self._ids[:]
+
+    async def list_inbounds(
+        self, tag: list[str] | str | None = None, include_users: bool = False
+    ) -> list[Inbound] | Inbound | None:
+        if tag is not None:
+            if isinstance(tag, str):
+                return self._inbounds[tag]
+            return [self._inbounds[t] for t in tag if t in self._inbounds]
+        return list(self._inbounds.values())
+
+    async def list_inbound_users(self, tag: str) -> list[User]:
+        return self._build_users(self._members.get(tag, ()))
+
+    def _remove_user(self, user_id: int) -> tuple[User, list[str]] | None:
+        """
+        removes a user if it's stored
+        :return: the removed user and tags of the inbounds it had,
+        None if it wasn't stored
+        """
+        if (row := self._row(user_id)) is None:
+            return None
+        previous = self._build_user(row, ())
+        self._garbage += self._username_lengths[row] + self._key_lengths[row]
+        for column in (
+            self._ids,
+            self._offsets,
+            self._username_lengths,
+            self._key_lengths,
+        ):
+            del column[row]
+        old_tags = [tag for tag, ids in self._members.items() if _discard(ids, user_id)]
+        self._compact_strings()
+        self._journal.record(ChangeKind.USER_REMOVED, user_id=user_id)
+        return previous, old_tags
+
+    async def remove_user(self, user: User) -> None:
+        self._remove_user(user.id)
+
+    def _store_strings(self, row: int, data: bytes) -> None:
+        """writes over the user's previous strings if they're no shorter"""
+        length = self._username_lengths[row] + self._key_lengths[row]
+        if len(data) <= length:
+            offset = self._offsets[row]
+            self._strings[offset : offset + len(data)] = data
+            self._garbage += length - len(data)
+        else:
+            self._offsets[row] = len(self._strings)
+            self._strings += data
+            self._garbage += length
+
+    def _set_user_inbounds(
+        self, user: User, inbounds: list[Inbound]
+    ) -> tuple[User | None, list[str]]:
+        """stores the user with its new inbounds
+        :return: the previously stored user, without its inbounds,
+        and tags of the inbounds it had
+        """
+        username, key = user.username.encode(), user.key.encode()
+        previous = None
+        if (row := self._row(user.id)) is None:
+            row = bisect_left(self._ids, user.id)
+            self._ids.insert(row, user.id)
+            self._offsets.insert(row, len(self._strings))
+            self._username_lengths.insert(row, len(username))
+            self._key_lengths.insert(row, len(key))
+            self._strings += username + key
+        else:
+            previous = self._build_user(row, ())
+            self._store_strings(row, username + key)
+            self._username_lengths[row] = len(username)
+            self._key_lengths[row] = len(key)
+            self._compact_strings()
+
+        tags = {inbound.tag for inbound in inbounds}
+        old_tags = []
+        for tag, ids in self._members.items():
+            position = bisect_left(ids, user.id)
+            member = position < len(ids) and ids[position] == user.id
+            if member:
+                old_tags.append(tag)
+                if tag not in tags:
+                    del ids[position]
+            elif tag in tags:
+                ids.insert(position, user.id)
+        for tag in tags - self._members.keys():
+            self._members[tag] = array("I", [user.id])
+        user.inbounds = self._shared_inbounds(
+            tuple(tag for tag in self._members if tag in tags)
+        )
+        self._journal.record(ChangeKind.USER_UPDATED, user_id=user.id)
+        return previous, old_tags
+
+    async def update_user_inbounds(self, user: User, inbounds: list[Inbound]) -> None:
+        self._set_user_inbounds(user, inbounds)
+
+    def _remove_users(self, user_ids: Iterable[int]) -> list[tuple[User, list[str]]]:
+        """
+        removes the stored ones of the users, rebuilding each column
+        and the members of each inbound once for all of them
+        :return: the removed users and tags of the inbounds each had
+        """
+        rows = sorted(
+            row for user_id in set(user_ids) if (row := self._row(user_id)) is not None
+        )
+        if not rows:
+            return []
+        old_tags = {self._ids[row]: [] for row in rows}
+        for tag, ids in self._members.items():
+            positions, position = [], 0
+            for user_id, tags in old_tags.items():
+                position = bisect_left(ids, user_id, position)
+                if position < len(ids) and ids[position] == user_id:
+                    positions.append(position)
+                    tags.append(tag)
+            if positions:
+                self._members[tag] = _splice(ids, positions, [])
+        removed = []
+        for row in rows:
+            removed.append((self._build_user(row, ()), old_tags[self._ids[row]]))
+            self._garbage += self._username_lengths[row] + self._key_lengths[row]
+        self._ids = _splice(self._ids, rows, [])
+        self._offsets = _splice(self._offsets, rows, [])
+        self._username_lengths = _splice(self._username_lengths, rows, [])
+        self._key_lengths = _splice(self._key_lengths, rows, [])
+        self._compact_strings()
+        for user_id in old_tags:
+            self._journal.record(ChangeKind.USER_REMOVED, user_id=user_id)
+        return removed
+
+    def _upsert_users(
+        self, updates: list[tuple[User, list[Inbound]]]
+    ) -> list[tuple[User | None, list[str]]]:
+        """
+        stores the users with their new inbounds, merging the new users into
+        the columns and the changed memberships into each inbound once
+        :param updates: users and their inbounds, sorted by id without repeats
+        :return: for each user the previously stored one, without its
+        inbounds, and tags of the inbounds it had
+        """
+        previous = []
+        new_rows, new_users = [], []
+        for user, _ in updates:
+            username, key = user.username.encode(), user.key.encode()
+            row = bisect_left(self._ids, user.id)
+            if row == len(self._ids) or self._ids[row] != user.id:
+                new_rows.append(row)
+                new_users.append((user.id, len(self._strings), len(username), len(key)))
+                self._strings += username + key
+                previous.append(None)
+            else:
+                previous.append(self._build_user(row, ()))
+                self._store_strings(row, username + key)
+                self._username_lengths[row] = len(username)
+                self._key_lengths[row] = len(key)
+        if new_rows:
+            columns = ("_ids", "_offsets", "_username_lengths", "_key_lengths")
+            for name, values in zip(columns, zip(*new_users)):
+                column = getattr(self, name)
+                setattr(self, name, _splice(column, [], list(zip(new_rows, values))))
+        self._compact_strings()
+
+        new_tags = [{inbound.tag for inbound in inbounds} for _, inbounds in updates]
+        for tag in set().union(*new_tags) - self._members.keys():
+            self._members[tag] = array("I")
+        old_tags = [[] for _ in updates]
+        for tag, ids in self._members.items():
+            dropped, inserted, position = [], [], 0
+            for (user, _), tags, had in zip(updates, new_tags, old_tags):
+                position = bisect_left(ids, user.id, position)
+                if position < len(ids) and ids[position] == user.id:
+                    had.append(tag)
+                    if tag not in tags:
+                        dropped.append(position)
+                elif tag in tags:
+                    inserted.append((position, user.id))
+            if dropped or inserted:
+                self._members[tag] = _splice(ids, dropped, inserted)
+
+        for (user, _), tags in zip(updates, new_tags):
+            user.inbounds = self._shared_inbounds(
+                tuple(tag for tag in self._members if tag in tags)
+            )
+            self._journal.record(ChangeKind.USER_UPDATED, user_id=user.id)
+        return list(zip(previous, old_tags))
+
+    async def bulk_upsert_users(
+        self, updates: Iterable[tuple[User, list[Inbound]]]
+    ) -> MembershipChanges:
+        changes = MembershipChanges()
+        latest = {user.id: (user, inbounds) for user, inbounds in updates}
+        removals = [
+            user_id for user_id, (_, inbounds) in latest.items() if not inbounds
+        ]
+        for removed_user, old_tags in self._remove_users(removals):
+            changes.record(removed_user, old_tags, None, [])
+        upserts = sorted(
+            (update for update in latest.values() if update[1]),
+            key=lambda update: update[0].id,
+        )
+        for (user, inbounds), (previous, old_tags) in zip(
+            upserts, self._upsert_users(upserts)
+        ):
+            changes.record(previous, old_tags, user, [i.tag for i in inbounds])
+        return changes
+
+    async def bulk_remove_users(self, user_ids: Iterable[int]) -> MembershipChanges:
+        changes = MembershipChanges()
+        for removed_user, old_tags in self._remove_users(user_ids):
+            changes.record(removed_user, old_tags, None, [])
+        return changes
+
+    def _compact_strings(self) -> None:
+        """rewrites the strings once half of them are garbage"""
+        if self._garbage <= len(self._strings) // 2:
+            return
+        strings = bytearray()
+        for row, offset in enumerate(self._offsets):
+            self._offsets[row] = len(strings)
+            length = self._username_lengths[row] + self._key_lengths[row]
+            strings += self._strings[offset : offset + length]
+        self._strings = strings
+        self._garbage = 0
+
+    def register_inbound(self, inbound: Inbound) -> None:
+        self._inbounds[inbound.tag] = inbound
+        self._inbound_sets = {}
+        self._journal.record(ChangeKind.INBOUND_REGISTERED, tag=inbound.tag)
+
+    def remove_inbound(self, inbound: Inbound | str) -> None:
+        tag = inbound if isinstance(inbound, str) else inbound.tag
+        self._inbounds.pop(tag, None)
+        self._members.pop(tag, None)
+        self._inbound_sets = {}
+        self._journal.record(ChangeKind.INBOUND_REMOVED, tag=tag)
+
+    async def stats(self) -> StorageStats:
+        inbound_users = {tag: len(self._members.get(tag, ())) for tag in self._inbounds}
+        columns = [
+            self._ids,
+            self._offsets,
+            self._username_lengths,
+            self._key_lengths,
+            *self._members.values(),
+        ]
+        return StorageStats(
+            len(self._ids),
+            inbound_users,
+            sum(len(column) * column.itemsize for column in columns)
+            + len(self._strings),
+        )
+
+    def snapshot(self) -> Snapshot:
+        return Snapshot(
+            self._ids[:],
+            self._offsets[:],
+            self._username_lengths[:],
+            self._key_lengths[:],
+            bytes(self._strings),
+            {tag: ids[:] for tag, ids in self._members.items()},
+        )
+
+    def restore(self, snapshot: Snapshot) -> None:
+        self._ids = snapshot.ids
+        self._offsets = snapshot.offsets
+        self._username_lengths = snapshot.username_lengths
+        self._key_lengths = snapshot.key_lengths
+        self._strings = bytearray(snapshot.strings)
+        self._garbage = (
+            len(self._strings) - sum(self._username_lengths) - sum(self._key_lengths)
+        )
+        self._members = snapshot.members
+        self._compact_strings()
+        self._journal.record(ChangeKind.USERS_FLUSHED)
+
+    async def flush_users(self):
+        self._reset_users()
+        self._journal.record(ChangeKind.USERS_FLUSHED)
@@ -0,0 +1,54 @@
+"""Keeps track of the changes made to a storage"""
+
+from collections import deque
+from enum import Enum
+from itertools import islice
+from typing import NamedTuple
+
+
+class ChangeKind(Enum):
+    USER_UPDATED = "user_updated"
+    USER_REMOVED = "user_removed"
+    INBOUND_REGISTERED = "inbound_registered"
+    INBOUND_REMOVED = "inbound_removed"
+    USERS_FLUSHED = "users_flushed"
+    """all users were dropped, or replaced e.g. by restoring a snapshot"""
+
+
+class Change(NamedTuple):
+    generation: int
+    kind: ChangeKind
+    user_id: int | None = None
+    tag: str | None = None
+
+
+class Journal:
+    """numbers every change with a generation and remembers the latest ones"""
+
+    def __init__(self, size: int):
+        self._changes: deque[Change] = deque(maxlen=size)
+        self._generation = 0
+
+    @property
+    def generation(self) -> int:
+        """the generation of the latest change, 0 if nothing has changed"""
+        return self._generation
+
+    def record(
+        self, kind: ChangeKind, user_id: int | None = None, tag: str | None = None
+    ) -> None:
+        self._generation += 1
+        self._changes.append(Change(self._generation, kind, user_id, tag))
+
+    def since(self, generation: int) -> list[Change] | None:
+        """
+        lists the changes made after a generation
+        :param generation: the generation the caller is up to date with
+        :return: the changes in order, None if some have been forgotten already
+        """
+        if generation >= self._generation:
+            return []
+        skipped = generation + 1 - (self._generation - len(self._changes) + 1)
+        if skipped < 0:
+            return None
+        return list(islice(self._changes, skipped, None))
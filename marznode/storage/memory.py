@@ -1,8 +1,20 @@
 """Storage backend for storing marznode data in memory"""
 
-from .base import BaseStorage
+from array import array
+from collections import defaultdict
+from collections.abc import Iterable
+
+from .base import BaseStorage, MembershipChanges, StorageStats
+from .journal import ChangeKind
+from .snapshot import Snapshot
 from ..models import User, Inbound
 
+_USER_BYTES = 240
+"""a user's object, its strings' headers and its entry in the users dict,
+as measured by benchmarks.user_memory"""
+_MEMBERSHIP_BYTES = 40
+"""an entry in the set of an inbound's users"""
+
 
 class MemoryStorage(BaseStorage):
     """A storage backend for marznode.
@@ -11,13 +23,29 @@ class MemoryStorage(BaseStorage):
     """
 
     def __init__(self):
+        super().__init__()
         self.storage = dict({"users": {}, "inbounds": {}})
+        self._inbound_users: dict[str, set[int]] = defaultdict(set)
+        """maps inbound tags to the ids of their users"""
+        self._inbound_sets: dict[tuple[str, ...], tuple[Inbound, ...]] = {}
+        """users with the same inbounds share a single tuple of them"""
+        self._string_bytes = 0
+        """characters in the usernames and keys of the users"""
+
+    def _shared_inbounds(self, inbounds: list[Inbound]) -> tuple[Inbound, ...]:
+        tags = tuple(inbound.tag for inbound in inbounds)
+        if (shared := self._inbound_sets.get(tags)) is None:
+            shared = self._inbound_sets[tags] = tuple(inbounds)
+        return shared
 
     async def list_users(self, user_id: int | None = None) -> list[User] | User | None:
         if user_id:
             return self.storage["users"].get(user_id)
         return list(self.storage["users"].values())
 
+    async def list_user_ids(self) -> Iterable[int]:
+        return list(self.storage["users"])
+
     async def list_inbounds(
         self, tag: list[str] | str | None = None, include_users: bool = False
     ) -> list[Inbound] | Inbound | None:
@@ -33,32 +61,160 @@ class MemoryStorage(BaseStorage):
         return list(self.storage["inbounds"].values())
 
     async def list_inbound_users(self, tag: str) -> list[User]:
-        users = []
-        for user in self.storage["users"].values():
-            for inbound in user.inbounds:
-                if inbound.tag == tag:
-                    users.append(user)
-                    break
-        return users
+        users = self.storage["users"]
+        return [users[user_id] for user_id in self._inbound_users.get(tag, ())]
 
-    async def remove_user(self, user: User) -> None:
-        del self.storage["users"][user.id]
+    def _drop_memberships(self, user_id: int) -> None:
+        """removes the user from the members of every inbound, including
+        those restored from a snapshot which aren't registered yet"""
+        for user_ids in self._inbound_users.values():
+            user_ids.discard(user_id)
 
-    async def update_user_inbounds(self, user: User, inbounds: list[Inbound]) -> None:
-        if self.storage["users"].get(user.id):
-            self.storage["users"][user.id].inbounds = inbounds
+    def _pop_user(self, user_id: int) -> User:
+        stored_user = self.storage["users"].pop(user_id)
+        self._string_bytes -= len(stored_user.username) + len(stored_user.key)
+        self._drop_memberships(user_id)
+        self._journal.record(ChangeKind.USER_REMOVED, user_id=user_id)
+        return stored_user
+
+    def _set_user_inbounds(
+        self, user: User, inbounds: list[Inbound]
+    ) -> tuple[User | None, list[str]]:
+        """stores the user with its new inbounds
+        :return: the previously stored user and tags of the inbounds it had
+        """
+        inbounds = self._shared_inbounds(inbounds)
+        old_tags = []
+        if stored_user := self.storage["users"].get(user.id):
+            old_tags = [inbound.tag for inbound in stored_user.inbounds]
+            self._drop_memberships(user.id)
+            stored_user.inbounds = inbounds
+            self._string_bytes -= len(stored_user.username) + len(stored_user.key)
+        self._string_bytes += len(user.username) + len(user.key)
+        for inbound in inbounds:
+            self._inbound_users[inbound.tag].add(user.id)
         user.inbounds = inbounds
         self.storage["users"][user.id] = user
+        self._journal.record(ChangeKind.USER_UPDATED, user_id=user.id)
+        return stored_user, old_tags
+
+    async def remove_user(self, user: User) -> None:
+        self._pop_user(user.id)
+
+    async def update_user_inbounds(self, user: User, inbounds: list[Inbound]) -> None:
+        self._set_user_inbounds(user, inbounds)
+
+    async def bulk_upsert_users(
+        self, updates: Iterable[tuple[User, list[Inbound]]]
+    ) -> MembershipChanges:
+        changes = MembershipChanges()
+        users = self.storage["users"]
+        latest = {user.id: (user, inbounds) for user, inbounds in updates}
+        for user, inbounds in latest.values():
+            if inbounds:
+                previous, old_tags = self._set_user_inbounds(user, inbounds)
+                changes.record(previous, old_tags, user, [i.tag for i in inbounds])
+            elif user.id in users:
+                previous = self._pop_user(user.id)
+                changes.record(previous, [i.tag for i in previous.inbounds], None, [])
+        return changes
+
+    async def bulk_remove_users(self, user_ids: Iterable[int]) -> MembershipChanges:
+        changes = MembershipChanges()
+        users = self.storage["users"]
+        for user_id in user_ids:
+            if user_id in users:
+                removed_user = self._pop_user(user_id)
+                old_tags = [i.tag for i in removed_user.inbounds]
+                changes.record(removed_user, old_tags, None, [])
+        return changes
 
     def register_inbound(self, inbound: Inbound) -> None:
         self.storage["inbounds"][inbound.tag] = inbound
+        self._inbound_sets = {}
+        """members of the inbound may have been restored before it's registered"""
+        users = self.storage["users"]
+        replacements = {}
+        for user_id in self._inbound_users.get(inbound.tag, ()):
+            user = users[user_id]
+            if (inbounds := replacements.get(user.inbounds)) is None:
+                inbounds = replacements[user.inbounds] = self._shared_inbounds(
+                    [inb for inb in user.inbounds if inb.tag != inbound.tag] + [inbound]
+                )
+            user.inbounds = inbounds
+        self._journal.record(ChangeKind.INBOUND_REGISTERED, tag=inbound.tag)
 
     def remove_inbound(self, inbound: Inbound | str) -> None:
         tag = inbound if isinstance(inbound, str) else inbound.tag
         if tag in self.storage["inbounds"]:
             self.storage["inbounds"].pop(tag)
-        for user_id, user in self.storage["users"].items():
-            user.inbounds = list(filter(lambda inb: inb.tag != tag, user.inbounds))
+        self._inbound_sets = {}
+        users = self.storage["users"]
+        for user_id in self._inbound_users.pop(tag, ()):
+            user = users[user_id]
+            user.inbounds = self._shared_inbounds(
+                [inb for inb in user.inbounds if inb.tag != tag]
+            )
+        self._journal.record(ChangeKind.INBOUND_REMOVED, tag=tag)
+
+    async def stats(self) -> StorageStats:
+        inbound_users = {
+            tag: len(self._inbound_users.get(tag, ()))
+            for tag in self.storage["inbounds"]
+        }
+        users = len(self.storage["users"])
+        memberships = sum(len(user_ids) for user_ids in self._inbound_users.values())
+        return StorageStats(
+            users,
+            inbound_users,
+            users * _USER_BYTES + self._string_bytes + memberships * _MEMBERSHIP_BYTES,
+        )
+
+    def snapshot(self) -> Snapshot:
+        ids = array("I", sorted(self.storage["users"]))
+        offsets, username_lengths, key_lengths = array("Q"), array("H"), array("H")
+        strings = bytearray()
+        users = self.storage["users"]
+        for user_id in ids:
+            user = users[user_id]
+            username, key = user.username.encode(), user.key.encode()
+            offsets.append(len(strings))
+            username_lengths.append(len(username))
+            key_lengths.append(len(key))
+            strings += username + key
+        members = {
+            tag: array("I", sorted(user_ids))
+            for tag, user_ids in self._inbound_users.items()
+            if user_ids
+        }
+        return Snapshot(ids, offsets, username_lengths, key_lengths, strings, members)
+
+    def restore(self, snapshot: Snapshot) -> None:
+        strings = snapshot.strings
+        users = {}
+        for user_id, offset, username_length, key_length in zip(
+            snapshot.ids,
+            snapshot.offsets,
+            snapshot.username_lengths,
+            snapshot.key_lengths,
+        ):
+            middle = offset + username_length
+            users[user_id] = User(
+                id=user_id,
+                username=strings[offset:middle].decode(),
+                key=strings[middle : middle + key_length].decode(),
+            )
+        self.storage["users"] = users
+        self._string_bytes = sum(snapshot.username_lengths) + sum(snapshot.key_lengths)
+        self._journal.record(ChangeKind.USERS_FLUSHED)
+        self._inbound_users = defaultdict(
+            set, {tag: set(ids) for tag, ids in snapshot.members.items()}
+        )
+        for inbound in list(self.storage["inbounds"].values()):
+            self.register_inbound(inbound)
 
     async def flush_users(self):
         self.storage["users"] = {}
+        self._inbound_users = defaultdict(set)
+        self._string_bytes = 0
+        self._journal.record(ChangeKind.USERS_FLUSHED)
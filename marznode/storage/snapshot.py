@@ -0,0 +1,141 @@
+"""Dumps users of the in-memory storages into a binary file and loads them back"""
+
+import asyncio
+import logging
+import mmap
+import os
+import struct
+import sys
+from array import array
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .base import BaseStorage
+
+logger = logging.getLogger(__name__)
+
+_MAGIC = b"MZNSNAP" + (b"<" if sys.byteorder == "little" else b">")
+"""the arrays are written in native byte order which is recorded in the magic"""
+_HEADER = struct.Struct("<8sQQI")
+"""magic, user count, length of the strings, inbound count"""
+_INBOUND_HEADER = struct.Struct("<HQ")
+"""length of the tag, member count"""
+
+
+@dataclass
+class Snapshot:
+    """users in columns, rows are sorted by id and so are the members of inbounds"""
+
+    ids: array
+    offsets: array
+    """where the username of each user, followed by its key, starts in strings"""
+    username_lengths: array
+    key_lengths: array
+    strings: bytes | bytearray
+    members: dict[str, array]
+    """maps inbound tags to the sorted ids of their users"""
+
+
+def write_snapshot(path: str, snapshot: Snapshot) -> None:
+    """writes a snapshot to a temporary file and moves it over path"""
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as file:
+        file.write(
+            _HEADER.pack(
+                _MAGIC, len(snapshot.ids), len(snapshot.strings), len(snapshot.members)
+            )
+        )
+        for column in (
+            snapshot.ids,
+            snapshot.offsets,
+            snapshot.username_lengths,
+            snapshot.key_lengths,
+            snapshot.strings,
+        ):
+            file.write(column)
+        for tag, members in snapshot.members.items():
+            encoded_tag = tag.encode()
+            file.write(_INBOUND_HEADER.pack(len(encoded_tag), len(members)))
+            file.write(encoded_tag)
+            file.write(members)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp_path, path)
+
+
+def read_snapshot(path: str) -> Snapshot:
+    """maps a snapshot file and copies its columns into arrays as they are"""
+    with (
+        open(path, "rb") as file,
+        mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped,
+        memoryview(mapped) as view,
+    ):
+        magic, user_count, strings_length, inbound_count = _HEADER.unpack_from(view)
+        if magic != _MAGIC:
+            raise ValueError(f"{path} is not a snapshot of this platform")
+        position = _HEADER.size
+
+        def take(typecode: str, count: int) -> array:
+            nonlocal position
+            column = array(typecode)
+            end = position + column.itemsize * count
+            if end > len(view):
+                raise ValueError(f"{path} is truncated")
+            column.frombytes(view[position:end])
+            position = end
+            return column
+
+        ids = take("I", user_count)
+        offsets = take("Q", user_count)
+        username_lengths = take("H", user_count)
+        key_lengths = take("H", user_count)
+        strings = bytearray(view[position : position + strings_length])
+        position += strings_length
+        members = {}
+        for _ in range(inbound_count):
+            tag_length, member_count = _INBOUND_HEADER.unpack_from(view, position)
+            position += _INBOUND_HEADER.size
+            tag = bytes(view[position : position + tag_length]).decode()
+            position += tag_length
+            members[tag] = take("I", member_count)
+    return Snapshot(ids, offsets, username_lengths, key_lengths, strings, members)
+
+
+class StorageSnapshotter:
+    """restores a storage from its snapshot at startup
+    and dumps it on an interval and at shutdown"""
+
+    def __init__(self, storage: "BaseStorage", path: str, interval: int):
+        self._storage = storage
+        self._path = path
+        self._interval = interval
+        self._task = None
+
+    def restore(self) -> None:
+        try:
+            snapshot = read_snapshot(self._path)
+        except FileNotFoundError:
+            return
+        except (ValueError, struct.error):
+            logger.exception("ignoring the unreadable snapshot %s", self._path)
+            return
+        self._storage.restore(snapshot)
+        logger.info("restored %i users from %s", len(snapshot.ids), self._path)
+
+    def start(self) -> None:
+        if self._interval:
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self._interval)
+            try:
+                await self.dump()
+            except OSError:
+                logger.exception("failed to dump a snapshot of the storage")
+
+    async def dump(self) -> None:
+        snapshot = self._storage.snapshot()
+        await asyncio.to_thread(write_snapshot, self._path, snapshot)
+        logger.debug("dumped %i users into %s", len(snapshot.ids), self._path)
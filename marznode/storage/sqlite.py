@@ -0,0 +1,220 @@
+"""Storage backend for storing marznode data in a sqlite database"""
+
+import sqlite3
+from collections import Counter
+from collections.abc import Iterable
+
+from .base import BaseStorage, MembershipChanges, StorageStats
+from .journal import ChangeKind
+from ..models import User, Inbound
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY,
+    username TEXT NOT NULL,
+    key TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS user_inbounds (
+    user_id INTEGER NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+    tag TEXT NOT NULL,
+    PRIMARY KEY (user_id, tag)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS user_inbounds_tag ON user_inbounds (tag, user_id);
+"""
+
+
+class SQLiteStorage(BaseStorage):
+    """A storage backend for marznode which keeps users on disk,
+    so they are served to the backends as soon as the node starts.
+    inbounds come from the backends' configs and are only kept in memory,
+    users keep their inbound tags even while the inbound isn't registered
+    """
+
+    def __init__(self, path: str):
+        super().__init__()
+        self._db = sqlite3.connect(path, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("PRAGMA foreign_keys=ON")
+        self._db.executescript(_SCHEMA)
+        self._inbounds: dict[str, Inbound] = {}
+        """the counts are kept up to date by every write,
+        so stats don't have to scan the tables"""
+        (self._user_count,) = self._db.execute("SELECT COUNT(*) FROM users").fetchone()
+        self._tag_counts = Counter(
+            dict(
+                self._db.execute("SELECT tag, COUNT(*) FROM user_inbounds GROUP BY tag")
+            )
+        )
+
+    def _count(
+        self, users: int, old_tags: Iterable[str], new_tags: Iterable[str]
+    ) -> None:
+        """accounts for a committed change in the counts"""
+        self._user_count += users
+        self._tag_counts.subtract(old_tags)
+        self._tag_counts.update(new_tags)
+
+    def _build_users(self, rows: list[tuple]) -> list[User]:
+        """builds users out of (id, username, key, tag) rows ordered by id"""
+        users = []
+        for user_id, username, key, tag in rows:
+            if not users or users[-1].id != user_id:
+                users.append(User(id=user_id, username=username, key=key, inbounds=[]))
+            if tag in self._inbounds:
+                users[-1].inbounds.append(self._inbounds[tag])
+        return users
+
+    async def list_users(self, user_id: int | None = None) -> list[User] | User | None:
+        query = (
+            "SELECT u.id, u.username, u.key, ui.tag FROM users u "
+            "LEFT JOIN user_inbounds ui ON ui.user_id = u.id"
+        )
+        if user_id is not None:
+            users = self._build_users(
+                self._db.execute(query + " WHERE u.id = ?", (user_id,)).fetchall()
+            )
+            return users[0] if users else None
+        return self._build_users(self._db.execute(query + " ORDER BY u.id").fetchall())
+
+    async def list_user_ids(self) -> Iterable[int]:
+        return [row[0] for row in self._db.execute("SELECT id FROM users")]
+
+    async def list_inbounds(
+        self, tag: list[str] | str | None = None, include_users: bool = False
+    ) -> list[Inbound] | Inbound | None:
+        if tag is not None:
+            if isinstance(tag, str):
+                return self._inbounds[tag]
+            return [self._inbounds[t] for t in tag if t in self._inbounds]
+        return list(self._inbounds.values())
+
+    async def list_inbound_users(self, tag: str) -> list[User]:
+        rows = self._db.execute(
+            "SELECT u.id, u.username, u.key, ui.tag FROM users u "
+            "JOIN user_inbounds ui ON ui.user_id = u.id "
+            "WHERE u.id IN (SELECT user_id FROM user_inbounds WHERE tag = ?) "
+            "ORDER BY u.id",
+            (tag,),
+        ).fetchall()
+        return self._build_users(rows)
+
+    async def remove_user(self, user: User) -> None:
+        previous, old_tags = self._stored_user(user.id)
+        self._db.execute("DELETE FROM users WHERE id = ?", (user.id,))
+        if previous is not None:
+            self._count(-1, old_tags, ())
+        self._journal.record(ChangeKind.USER_REMOVED, user_id=user.id)
+
+    def _write_user(self, user: User, inbounds: list[Inbound]) -> None:
+        """writes a user and its inbounds, should be called within a transaction"""
+        self._db.execute(
+            "INSERT INTO users (id, username, key) VALUES (?, ?, ?) "
+            "ON CONFLICT (id) DO UPDATE "
+            "SET username = excluded.username, key = excluded.key",
+            (user.id, user.username, user.key),
+        )
+        self._db.execute("DELETE FROM user_inbounds WHERE user_id = ?", (user.id,))
+        self._db.executemany(
+            "INSERT INTO user_inbounds (user_id, tag) VALUES (?, ?)",
+            [(user.id, inbound.tag) for inbound in inbounds],
+        )
+
+    def _stored_user(self, user_id: int) -> tuple[User | None, list[str]]:
+        """:return: the stored user, without its inbounds, and their tags"""
+        row = self._db.execute(
+            "SELECT username, key FROM users WHERE id = ?", (user_id,)
+        ).fetchone()
+        if row is None:
+            return None, []
+        tags = [
+            tag
+            for (tag,) in self._db.execute(
+                "SELECT tag FROM user_inbounds WHERE user_id = ?", (user_id,)
+            )
+        ]
+        return User(id=user_id, username=row[0], key=row[1]), tags
+
+    async def update_user_inbounds(self, user: User, inbounds: list[Inbound]) -> None:
+        with self._db:
+            self._db.execute("BEGIN")
+            previous, old_tags = self._stored_user(user.id)
+            self._write_user(user, inbounds)
+        self._count(int(previous is None), old_tags, {i.tag for i in inbounds})
+        user.inbounds = inbounds
+        self._journal.record(ChangeKind.USER_UPDATED, user_id=user.id)
+
+    async def bulk_upsert_users(
+        self, updates: Iterable[tuple[User, list[Inbound]]]
+    ) -> MembershipChanges:
+        changes = MembershipChanges()
+        applied = []
+        users, old_counts, new_counts = 0, Counter(), Counter()
+        latest = {user.id: (user, inbounds) for user, inbounds in updates}
+        with self._db:
+            self._db.execute("BEGIN")
+            for user, inbounds in latest.values():
+                previous, old_tags = self._stored_user(user.id)
+                if inbounds:
+                    self._write_user(user, inbounds)
+                    user.inbounds = inbounds
+                    applied.append((ChangeKind.USER_UPDATED, user.id))
+                    new_tags = {i.tag for i in inbounds}
+                    changes.record(previous, old_tags, user, new_tags)
+                    users += int(previous is None)
+                    old_counts.update(old_tags)
+                    new_counts.update(new_tags)
+                elif previous is not None:
+                    self._db.execute("DELETE FROM users WHERE id = ?", (user.id,))
+                    applied.append((ChangeKind.USER_REMOVED, user.id))
+                    changes.record(previous, old_tags, None, [])
+                    users -= 1
+                    old_counts.update(old_tags)
+        self._count(users, old_counts, new_counts)
+        for kind, user_id in applied:
+            self._journal.record(kind, user_id=user_id)
+        return changes
+
+    async def bulk_remove_users(self, user_ids: Iterable[int]) -> MembershipChanges:
+        changes = MembershipChanges()
+        removed = []
+        old_counts = Counter()
+        with self._db:
+            self._db.execute("BEGIN")
+            for user_id in user_ids:
+                previous, old_tags = self._stored_user(user_id)
+                if previous is not None:
+                    self._db.execute("DELETE FROM users WHERE id = ?", (user_id,))
+                    changes.record(previous, old_tags, None, [])
+                    removed.append(user_id)
+                    old_counts.update(old_tags)
+        self._count(-len(removed), old_counts, ())
+        for user_id in removed:
+            self._journal.record(ChangeKind.USER_REMOVED, user_id=user_id)
+        return changes
+
+    async def stats(self) -> StorageStats:
+        (page_count,) = self._db.execute("PRAGMA page_count").fetchone()
+        (page_size,) = self._db.execute("PRAGMA page_size").fetchone()
+        return StorageStats(
+            self._user_count,
+            {tag: self._tag_counts[tag] for tag in self._inbounds},
+            page_count * page_size,
+        )
+
+    def register_inbound(self, inbound: Inbound) -> None:
+        self._inbounds[inbound.tag] = inbound
+        self._journal.record(ChangeKind.INBOUND_REGISTERED, tag=inbound.tag)
+
+    def remove_inbound(self, inbound: Inbound | str) -> None:
+        tag = inbound if isinstance(inbound, str) else inbound.tag
+        self._inbounds.pop(tag, None)
+        self._db.execute("DELETE FROM user_inbounds WHERE tag = ?", (tag,))
+        self._tag_counts.pop(tag, None)
+        self._journal.record(ChangeKind.INBOUND_REMOVED, tag=tag)
+
+    async def flush_users(self):
+        self._db.execute("DELETE FROM users")
+        self._user_count = 0
+        self._tag_counts = Counter()
+        self._journal.record(ChangeKind.USERS_FLUSHED)
@@ -0,0 +1,7 @@
+"""A module to collect and accumulate usages of users"""
+
+from .accumulator import UsageAccumulator
+from .collector import UsageCollector
+from .harvester import UsageHarvester
+
+__all__ = ["UsageAccumulator", "UsageCollector", "UsageHarvester"]
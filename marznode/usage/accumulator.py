@@ -0,0 +1,127 @@
+"""Accumulates usages of users in memory, backed by an append-only file"""
+
+import asyncio
+import logging
+import os
+import struct
+from collections import defaultdict
+from collections.abc import Iterable
+
+logger = logging.getLogger(__name__)
+
+_RECORD = struct.Struct("<IQ")
+"""a record is a user id followed by a usage to add to the user's total"""
+
+
+class UsageAccumulator:
+    """
+    keeps the totals of usages until the client has got them
+    every addition is appended to the file so the totals survive restarts,
+    the file is rewritten with just the totals once it holds too many records.
+    usages handed out stay in the file until they're settled, those which
+    weren't settled before a restart are handed out again
+    """
+
+    def __init__(self, path: str, compaction_threshold: int = 100_000):
+        self._path = path
+        self._compaction_threshold = compaction_threshold
+        self._totals: dict[int, int] = defaultdict(int)
+        self._handed: dict[int, dict[int, int]] = {}
+        """usages handed out by their ticket"""
+        self._tickets = 0
+        self._records = 0
+        self._lock = asyncio.Lock()
+        """writes to the file happen in a thread, one at a time"""
+        self._load()
+        self._file = open(self._path, "ab")
+
+    def _load(self) -> None:
+        try:
+            with open(self._path, "rb") as file:
+                data = file.read()
+        except FileNotFoundError:
+            return
+        usable = len(data) - len(data) % _RECORD.size
+        if usable != len(data):
+            logger.warning("ignoring a partially written record in %s", self._path)
+            with open(self._path, "r+b") as file:
+                file.truncate(usable)
+        for uid, usage in _RECORD.iter_unpack(data[:usable]):
+            self._totals[uid] += usage
+        self._records = usable // _RECORD.size
+        logger.info("loaded usages of %i users from %s", len(self._totals), self._path)
+
+    @property
+    def totals(self) -> dict[int, int]:
+        return self._totals
+
+    def _append(self, data: bytes) -> None:
+        self._file.write(data)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    async def add(self, usages: dict[int, int]) -> None:
+        """adds usages to the totals and persists them"""
+        usages = {uid: usage for uid, usage in usages.items() if usage}
+        if not usages:
+            return
+        data = b"".join(_RECORD.pack(uid, usage) for uid, usage in usages.items())
+        async with self._lock:
+            await asyncio.to_thread(self._append, data)
+            """only counted once written, so a compaction never writes
+            usages which are about to be appended as well"""
+            for uid, usage in usages.items():
+                self._totals[uid] += usage
+            self._records += len(usages)
+            if self._records > max(self._compaction_threshold, 2 * len(self._totals)):
+                await self._compact()
+
+    def take(self) -> tuple[int, dict[int, int]]:
+        """
+        hands out the totals and starts over from zero,
+        they're kept in the file until they're settled
+        :return: a ticket to settle or return the usages with, and the usages
+        """
+        self._tickets += 1
+        totals, self._totals = self._totals, defaultdict(int)
+        if totals:
+            self._handed[self._tickets] = totals
+        return self._tickets, totals
+
+    def give_back(self, ticket: int) -> None:
+        """puts usages which didn't reach the client back into the totals"""
+        for uid, usage in self._handed.pop(ticket, {}).items():
+            self._totals[uid] += usage
+
+    async def settle(self, tickets: Iterable[int]) -> None:
+        """drops usages the client has got from the file"""
+        settled = [self._handed.pop(ticket, None) for ticket in tickets]
+        if all(usages is None for usages in settled):
+            return
+        async with self._lock:
+            await self._compact()
+
+    def _write(self, data: bytes) -> None:
+        temp_path = self._path + ".tmp"
+        with open(temp_path, "wb") as file:
+            file.write(data)
+            file.flush()
+            os.fsync(file.fileno())
+        self._file.close()
+        os.replace(temp_path, self._path)
+        self._file = open(self._path, "ab")
+
+    async def _compact(self) -> None:
+        """rewrites the file so it holds one record per user,
+        should be called holding the lock"""
+        usages = defaultdict(int, self._totals)
+        for handed in self._handed.values():
+            for uid, usage in handed.items():
+                usages[uid] += usage
+        data = b"".join(_RECORD.pack(uid, usage) for uid, usage in usages.items())
+        await asyncio.to_thread(self._write, data)
+        self._records = len(usages)
+
+    async def close(self) -> None:
+        async with self._lock:
+            self._file.close()
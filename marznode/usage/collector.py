@@ -0,0 +1,77 @@
+"""Queries usages of all backends concurrently"""
+
+import asyncio
+import logging
+from collections import defaultdict
+from collections.abc import AsyncIterator
+
+from marznode.backends.abstract_backend import VPNBackend
+
+logger = logging.getLogger(__name__)
+
+
+class UsageCollector:
+    """collects usages of backends, each within its own deadline"""
+
+    def __init__(self, backends: dict[str, VPNBackend], timeout: float):
+        self._backends = backends
+        self._timeout = timeout
+        self._usage_tasks: dict[str, asyncio.Task] = {}
+
+    async def collect(self) -> AsyncIterator[tuple[str, dict[int, int] | None]]:
+        """
+        queries usages of all backends concurrently and yields them as they arrive
+        a backend which doesn't answer within the timeout is yielded with None,
+        its query is left running and the counters it has already reset are
+        handed to the next collection instead of being dropped
+        """
+        tasks = {}
+        for name, backend in self._backends.items():
+            if name not in self._usage_tasks:
+                self._usage_tasks[name] = asyncio.create_task(backend.get_usages())
+            tasks[self._usage_tasks[name]] = name
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self._timeout
+        pending = set(tasks)
+        while pending and (timeout := deadline - loop.time()) > 0:
+            done, pending = await asyncio.wait(
+                pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+            )
+            results = []
+            for task in done:
+                name = tasks[task]
+                if self._usage_tasks.get(name) is not task:
+                    """another collection has already consumed the result"""
+                    continue
+                del self._usage_tasks[name]
+                if task.exception():
+                    logger.error(
+                        "fetching usages of backend `%s` failed: %r",
+                        name,
+                        task.exception(),
+                    )
+                    results.append((name, None))
+                else:
+                    results.append((name, task.result()))
+            for result in results:
+                yield result
+
+        for task in pending:
+            logger.warning("backend `%s` didn't report usages in time", tasks[task])
+            yield tasks[task], None
+
+    async def gather(self) -> tuple[dict[int, int], list[str]]:
+        """sums up usages of all backends
+        :return: usages by user id and names of the backends that didn't report
+        """
+        all_stats = defaultdict(int)
+        incomplete_backends = []
+
+        async for backend_name, stats in self.collect():
+            if stats is None:
+                incomplete_backends.append(backend_name)
+                continue
+            for user, usage in stats.items():
+                all_stats[user] += usage
+        return all_stats, incomplete_backends
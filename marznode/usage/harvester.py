@@ -0,0 +1,64 @@
+"""Periodically drains usages of the backends into an accumulator"""
+
+import asyncio
+import logging
+
+from .accumulator import UsageAccumulator
+from .collector import UsageCollector
+
+logger = logging.getLogger(__name__)
+
+
+class UsageHarvester:
+    """harvests usages on an interval so they don't pile up in the cores,
+    where they'd be lost if a core restarts while the client is away"""
+
+    def __init__(
+        self, collector: UsageCollector, accumulator: UsageAccumulator, interval: int
+    ):
+        self._collector = collector
+        self._accumulator = accumulator
+        self._interval = interval
+        self._task = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self._interval)
+            try:
+                await self.harvest()
+            except OSError:
+                logger.exception("failed to persist harvested usages")
+
+    async def harvest(self) -> None:
+        usages, incomplete_backends = await self._collector.gather()
+        await self._accumulator.add(usages)
+        logger.debug(
+            "harvested usages of %i users, backends not reporting: %s",
+            len(usages),
+            incomplete_backends,
+        )
+
+    def take(self) -> tuple[int, dict[int, int]]:
+        """hands over the usages harvested so far, along with a ticket
+        to settle them with once the client has got them"""
+        return self._accumulator.take()
+
+    def give_back(self, ticket: int) -> None:
+        self._accumulator.give_back(ticket)
+
+    async def settle(self, tickets: list[int]) -> None:
+        await self._accumulator.settle(tickets)
+
+    async def stop(self) -> None:
+        """harvests once more, as the cores' counters are lost when they
+        exit along with marznode, and closes the accumulator"""
+        if self._task is not None:
+            self._task.cancel()
+        try:
+            await self.harvest()
+        except OSError:
+            logger.exception("failed to persist harvested usages")
+        await self._accumulator.close()
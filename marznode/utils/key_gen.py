@@ -1,12 +1,18 @@
 """Used to generate uuid/password based on the seed"""
 
 import uuid
+from functools import lru_cache
 
 import xxhash
 
-from marznode.config import AuthAlgorithm, AUTH_GENERATION_ALGORITHM
+from marznode.config import (
+    AuthAlgorithm,
+    AUTH_GENERATION_ALGORITHM,
+    CREDENTIALS_CACHE_SIZE,
+)
 
 
+@lru_cache(maxsize=CREDENTIALS_CACHE_SIZE)
 def generate_uuid(key: str) -> uuid.UUID:
     """
     generates a uuid based on key as seed
@@ -19,6 +25,7 @@ def generate_uuid(key: str) -> uuid.UUID:
         return uuid.UUID(bytes=xxhash.xxh128(key.encode()).digest())
 
 
+@lru_cache(maxsize=CREDENTIALS_CACHE_SIZE)
 def generate_password(key: str) -> str:
     """
     generates a hex string based on the key as seed
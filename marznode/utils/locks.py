@@ -0,0 +1,62 @@
+"""Async locks keyed by an id"""
+
+import asyncio
+from collections.abc import AsyncIterator, Hashable, Iterable
+from contextlib import asynccontextmanager
+
+
+class KeyedLock:
+    """
+    hands out a lock per key so work on different keys runs concurrently,
+    a key's lock is dropped once nobody holds or waits for it
+    """
+
+    def __init__(self):
+        self._locks: dict[Hashable, tuple[asyncio.Lock, int]] = {}
+        """maps keys to their lock and the number of tasks holding or awaiting it"""
+
+    def __len__(self) -> int:
+        return len(self._locks)
+
+    def _checkout(self, key: Hashable) -> asyncio.Lock:
+        lock, users = self._locks.get(key, (None, 0))
+        if lock is None:
+            lock = asyncio.Lock()
+        self._locks[key] = (lock, users + 1)
+        return lock
+
+    def _checkin(self, key: Hashable) -> None:
+        lock, users = self._locks[key]
+        if users == 1:
+            del self._locks[key]
+        else:
+            self._locks[key] = (lock, users - 1)
+
+    @asynccontextmanager
+    async def acquire(self, key: Hashable) -> AsyncIterator[None]:
+        lock = self._checkout(key)
+        try:
+            async with lock:
+                yield
+        finally:
+            self._checkin(key)
+
+    @asynccontextmanager
+    async def acquire_many(self, keys: Iterable[Hashable]) -> AsyncIterator[None]:
+        """acquires the locks of all keys, in sorted order so that
+        two callers with overlapping keys can't deadlock"""
+        held = []
+        try:
+            for key in sorted(set(keys)):
+                lock = self._checkout(key)
+                try:
+                    await lock.acquire()
+                except BaseException:
+                    self._checkin(key)
+                    raise
+                held.append((key, lock))
+            yield
+        finally:
+            for key, lock in held:
+                lock.release()
+                self._checkin(key)
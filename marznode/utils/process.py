@@ -0,0 +1,16 @@
+"""Resource usage of the marznode process"""
+
+import os
+import resource
+
+
+def rss_bytes() -> int:
+    """
+    reads the resident set size of the process
+    :return: the current rss, or the peak rss where /proc isn't available
+    """
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024